@@ -1,18 +1,22 @@
 from typing import Generator, Optional
-from datetime import datetime, timezone
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
 from app.core.config import settings
+from app.core.activity import activity_buffer
+from app.core.principal_cache import principal_cache
+from app.core.rate_limit import RateLimitExceeded, rate_limiter
 from app.models.user import User
 from app.crud import crud_user
 from app.schemas.user import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login/access-token")
 
+GUEST_EMAIL = "guest@vidyamitra.com"
+
 def get_db() -> Generator:
     try:
         db = SessionLocal()
@@ -36,18 +40,44 @@ def _resolve_user_role(user: User) -> str:
     return user.role or "user"
 
 def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+    request: Request, db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
+    """
+    Resolve the bearer token to a user, once per request: the outcome is
+    memoized on request.state, so get_current_user_optional (e.g. inside
+    rate_limit) and get_current_active_user share one resolution.
+    """
+    memo = getattr(request.state, "principal", None)
+    if memo is not None and memo[0] == token:
+        if isinstance(memo[1], HTTPException):
+            raise memo[1]
+        return memo[1]
+    try:
+        user = _authenticate(db, token)
+    except HTTPException as e:
+        request.state.principal = (token, e)
+        raise
+    request.state.principal = (token, user)
+    return user
+
+def _authenticate(db: Session, token: str) -> User:
     if token == "GUEST_TOKEN":
         import uuid
         guest_id = uuid.uuid4()
         return User(
             id=guest_id,
-            email="guest@vidyamitra.com",
+            email=GUEST_EMAIL,
             is_active=True,
             is_superuser=False,
             role="user"
         )
+    # ── PRINCIPAL CACHE ──────────────────────────────────────
+    # Recently verified token: no decode, no user queries
+    cached_user = principal_cache.get(token)
+    if cached_user is not None:
+        activity_buffer.touch(cached_user.id, cached_user.last_active_at)
+        return cached_user
+
     # Define credential exception generator to allow dynamic details
     def get_credentials_exception(detail_msg: str):
         return HTTPException(
@@ -138,13 +168,11 @@ def get_current_user(
         db.commit()
         db.refresh(user)
     
-    # ── UPDATE LAST ACTIVE ───────────────────────────────────
-    try:
-        user.last_active_at = datetime.now(timezone.utc)
-        db.add(user)
-        db.commit()
-    except Exception:
-        db.rollback()
+    principal_cache.put(token, user, payload.get("exp"))
+
+    # ── RECORD ACTIVITY ──────────────────────────────────────
+    # Buffered and bulk-flushed by a background job (no write per request)
+    activity_buffer.touch(user.id, user.last_active_at)
     
     return user
 
@@ -156,13 +184,14 @@ def get_current_active_user(
     return current_user
 
 def get_current_user_optional(
+    request: Request,
     db: Session = Depends(get_db), 
     token: Optional[str] = Depends(OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login/access-token", auto_error=False))
 ) -> Optional[User]:
     if not token:
         return None
     try:
-        return get_current_user(db, token)
+        return get_current_user(request, db, token)
     except:
         return None
 
@@ -199,3 +228,54 @@ def require_black_admin(
             detail="Super admin access required."
         )
     return current_user
+
+# ══════════════════════════════════════════════════════════════
+# RATE LIMITING
+# ══════════════════════════════════════════════════════════════
+
+def _client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+class RateLimitCharge:
+    """
+    A request admitted by rate_limit (already charged one unit). Endpoints
+    that make several LLM calls charge the rest with charge(extra).
+    """
+
+    def __init__(self, cost_class: str, identity: str, is_guest: bool):
+        self.cost_class = cost_class
+        self.identity = identity
+        self.is_guest = is_guest
+
+    def charge(self, units: int) -> None:
+        """Charge `units` more; raises 429 when that goes over a limit or budget."""
+        try:
+            rate_limiter.check(self.cost_class, self.identity, self.is_guest, units)
+        except RateLimitExceeded as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=e.detail,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+def rate_limit(cost_class: str):
+    """
+    Dependency factory: limit requests per cost class ("otp", "auth", "llm").
+    Signed-in users are keyed by id; anonymous and guest callers by IP.
+    Use as `dependencies=[...]`, or as a RateLimitCharge parameter when the
+    endpoint needs to charge extra units.
+    """
+    def dependency(
+        request: Request,
+        current_user: Optional[User] = Depends(get_current_user_optional),
+    ) -> RateLimitCharge:
+        is_guest = current_user is None or current_user.email == GUEST_EMAIL
+        identity = f"ip:{_client_ip(request)}" if is_guest else f"user:{current_user.id}"
+        limit = RateLimitCharge(cost_class, identity, is_guest)
+        limit.charge(1)
+        return limit
+    return dependency
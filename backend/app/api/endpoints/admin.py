@@ -3,8 +3,9 @@ Admin API Endpoints — VidyaMithra Multi-Level Admin System
 
 Routes:
   require_admin:
-    GET  /admin/users           — List all users
-    GET  /admin/progress        — View all progress
+    GET  /admin/users           — List all users (paginated)
+    GET  /admin/progress        — View all progress (paginated)
+    GET  /admin/export/users    — Stream users + progress as CSV / NDJSON
     GET  /admin/inactivity      — Inactivity dashboard
 
   require_black_admin:
@@ -20,7 +21,8 @@ Routes:
 from datetime import datetime, timezone, timedelta
 from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func as sql_func
 
 from app.api import deps
@@ -30,6 +32,8 @@ from app.schemas.user import (
     PromoteRequest, DemoteRequest, DeleteUserRequest, BlacklistRecord
 )
 from app.core.config import settings
+from app.core.principal_cache import principal_cache
+from app.services import admin_service
 import uuid
 
 router = APIRouter()
@@ -43,97 +47,63 @@ router = APIRouter()
 def list_all_users(
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.require_admin),
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
     search: Optional[str] = None,
 ) -> Any:
-    """List all users with profile details. Accessible by admin + black_admin."""
+    """
+    List all users with profile details. Accessible by admin + black_admin.
+    `search` matches email or full name (trigram-indexed, see migration 011).
+    """
     query = db.query(User)
     
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            (User.email.ilike(search_pattern))
-        )
-    
-    total = query.count()
-    users = query.order_by(User.created_at.desc()).offset(skip).limit(limit).all()
-    
-    from app.models.career import Roadmap, ProgressSnapshot
+    if search and search.strip():
+        query = query.filter(admin_service.user_search_filter(search.strip()))
+        # Windowed count: exact up to the cap, then reported as a lower bound
+        total, total_exact = admin_service.windowed_count(query, settings.ADMIN_SEARCH_COUNT_CAP)
+    else:
+        total, total_exact = admin_service.admin_stats.get(db)["total_users"], False
     
-    result = []
-    for u in users:
-        # Get active roadmap status
-        roadmap = db.query(Roadmap).filter(Roadmap.user_id == u.id, Roadmap.is_active == True).first()
-        progress_status = "No Roadmap"
-        if roadmap and roadmap.roadmap_data and "levels" in roadmap.roadmap_data:
-            # Figure out current stage (Stage 1, Stage 2, etc.) based on completion
-            # Simple heuristic: find the lowest locked/unlocked level
-            levels = roadmap.roadmap_data["levels"]
-            current_stage = 1
-            for idx, lvl in enumerate(levels):
-                is_completed = all(s.get("status") == "completed" for s in lvl.get("skills", []))
-                if not is_completed:
-                    current_stage = idx + 1
-                    break
-            else:
-                current_stage = len(levels) # All completed
-            progress_status = f"Stage {current_stage}: {roadmap.target_role}"
-
-        # Get latest progress snapshot
-        snap = db.query(ProgressSnapshot).filter(ProgressSnapshot.user_id == u.id).order_by(ProgressSnapshot.snapshot_date.desc()).first()
-
-        result.append({
-            "id": str(u.id),
-            "email": u.email,
-            "role": u.role or "user",
-            "is_active": u.is_active,
-            "is_blacklisted": u.is_blacklisted,
-            "last_active_at": u.last_active_at.isoformat() if u.last_active_at else None,
-            "created_at": u.created_at.isoformat() if u.created_at else None,
-            "full_name": u.profile.full_name if u.profile else u.email.split("@")[0],
-            "progress_status": progress_status,
-            "career_score": snap.career_readiness_score if snap else 0.0,
-            "quizzes_passed": snap.total_quizzes_passed if snap else 0,
-            "interviews_done": snap.total_interviews_done if snap else 0,
-        })
+    users = query.options(joinedload(User.profile)).order_by(
+        User.created_at.desc()
+    ).offset(skip).limit(limit).all()
     
-    return {"users": result, "total": total}
+    # Roadmap stage + latest snapshot for the whole page in two queries
+    return {"users": admin_service.user_rows(db, users), "total": total, "total_exact": total_exact}
 
 
 @router.get("/progress")
 def view_all_progress(
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.require_admin),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
 ) -> Any:
     """View all user progress. Accessible by admin + black_admin."""
-    users = db.query(User).order_by(User.created_at.desc()).all()
-    
-    result = []
-    for u in users:
-        # Gather quiz attempts count
-        from app.models.career import QuizAttempt, ProgressSnapshot
-        quiz_count = db.query(QuizAttempt).filter(QuizAttempt.user_id == u.id).count()
-        
-        # Gather progress snapshot
-        progress = db.query(ProgressSnapshot).filter(
-            ProgressSnapshot.user_id == u.id
-        ).order_by(ProgressSnapshot.snapshot_date.desc()).first()
-        
-        result.append({
-            "id": str(u.id),
-            "email": u.email,
-            "full_name": u.profile.full_name if u.profile else u.email.split("@")[0],
-            "role": u.role or "user",
-            "quiz_attempts": quiz_count,
-            "last_active_at": u.last_active_at.isoformat() if u.last_active_at else None,
-            "progress_data": {
-                "overall_score": progress.overall_score if progress else 0,
-                "skills_count": len(progress.skill_scores) if progress and progress.skill_scores else 0,
-            } if progress else None,
-        })
+    total = db.query(sql_func.count(User.id)).scalar()
+    users = db.query(User).options(joinedload(User.profile)).order_by(
+        User.created_at.desc()
+    ).offset(skip).limit(limit).all()
     
-    return {"progress": result}
+    return {"progress": admin_service.progress_rows(db, users), "total": total}
+
+
+@router.get("/export/users")
+def export_users(
+    current_user: User = Depends(deps.require_admin),
+    format: str = Query(default="csv", pattern="^(csv|ndjson)$"),
+) -> Any:
+    """
+    Stream every user with roadmap stage and latest progress as CSV or NDJSON.
+    Accessible by admin + black_admin.
+    """
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        admin_service.stream_user_export(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users-{stamp}.{format}"'},
+    )
 
 
 @router.get("/inactivity")
@@ -149,7 +119,7 @@ def inactivity_dashboard(
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
     
     # Users who either never had activity OR were last active before cutoff
-    inactive_users = db.query(User).filter(
+    inactive_users = db.query(User).options(joinedload(User.profile)).filter(
         (User.last_active_at == None) | (User.last_active_at < cutoff)
     ).order_by(User.last_active_at.asc().nullsfirst()).all()
     
@@ -177,19 +147,14 @@ def admin_stats(
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.require_admin),
 ) -> Any:
-    """Quick statistics for admin dashboard."""
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(
-        User.last_active_at >= datetime.now(timezone.utc) - timedelta(days=7)
-    ).count()
-    blacklisted_users = db.query(User).filter(User.is_blacklisted == True).count()
-    admin_count = db.query(User).filter(User.role == "admin").count()
-    
+    """Quick statistics for admin dashboard (cached, see admin_service.admin_stats)."""
+    stats = admin_service.admin_stats.get(db)
     return {
-        "total_users": total_users,
-        "active_users_7d": active_users,
-        "blacklisted_users": blacklisted_users,
-        "admin_count": admin_count,
+        "total_users": stats["total_users"],
+        "active_users_7d": stats["active_users_7d"],
+        "blacklisted_users": stats["blacklisted_users"],
+        "admin_count": stats["admin_count"],
+        "stats_as_of": stats["stats_as_of"],
     }
 
 
@@ -206,18 +171,10 @@ def command_centre(
     Admin Command Centre — Full system overview.
     Only accessible by black_admin.
     """
-    total_users = db.query(User).count()
-    active_7d = db.query(User).filter(
-        User.last_active_at >= datetime.now(timezone.utc) - timedelta(days=7)
-    ).count()
-    active_30d = db.query(User).filter(
-        User.last_active_at >= datetime.now(timezone.utc) - timedelta(days=30)
-    ).count()
-    blacklisted = db.query(User).filter(User.is_blacklisted == True).count()
-    admin_count = db.query(User).filter(User.role == "admin").count()
+    stats = admin_service.admin_stats.get(db)
     
     # Recent registrations
-    recent_users = db.query(User).order_by(
+    recent_users = db.query(User).options(joinedload(User.profile)).order_by(
         User.created_at.desc()
     ).limit(10).all()
     
@@ -246,11 +203,12 @@ def command_centre(
         })
     
     return {
-        "total_users": total_users,
-        "active_users_7d": active_7d,
-        "active_users_30d": active_30d,
-        "blacklisted_users": blacklisted,
-        "admin_count": admin_count,
+        "total_users": stats["total_users"],
+        "active_users_7d": stats["active_users_7d"],
+        "active_users_30d": stats["active_users_30d"],
+        "blacklisted_users": stats["blacklisted_users"],
+        "admin_count": stats["admin_count"],
+        "stats_as_of": stats["stats_as_of"],
         "recent_registrations": recent_list,
         "blacklist_records": bl_list,
     }
@@ -313,6 +271,8 @@ def blacklist_user(
         db.add(bl)
     
     db.commit()
+    principal_cache.invalidate_user(target_id)
+    admin_service.admin_stats.invalidate()
     return {"message": f"User {target.email} has been blacklisted.", "success": True}
 
 
@@ -332,6 +292,8 @@ def unblacklist_user(
     db.add(target)
     db.commit()
     
+    principal_cache.invalidate_user(target_id)
+    admin_service.admin_stats.invalidate()
     # NOTE: blacklist record is NOT deleted — preserved for audit
     return {"message": f"User {target.email} has been unblacklisted.", "success": True}
 
@@ -357,6 +319,8 @@ def promote_user(
     target.role = "admin"
     db.add(target)
     db.commit()
+    principal_cache.invalidate_user(target_id)
+    admin_service.admin_stats.invalidate()
     return {"message": f"User {target.email} promoted to admin.", "success": True}
 
 
@@ -383,6 +347,8 @@ def demote_user(
     target.role = "user"
     db.add(target)
     db.commit()
+    principal_cache.invalidate_user(target_id)
+    admin_service.admin_stats.invalidate()
     return {"message": f"User {target.email} demoted to user.", "success": True}
 
 
@@ -422,4 +388,6 @@ def delete_user(
     db.delete(target)
     db.commit()
     
+    principal_cache.invalidate_user(target_id)
+    admin_service.admin_stats.invalidate()
     return {"message": f"User {email} has been permanently deleted.", "success": True}
@@ -8,13 +8,16 @@ import random
 from app import crud, models, schemas
 from app.api import deps
 from app.api.deps import _get_black_admin_emails
+from app.crud.crud_otp import (
+    OTP_VALID, OTP_INVALID, OTP_NOT_FOUND, OTP_EXPIRED, OTP_TOO_MANY_ATTEMPTS, OTP_USED
+)
 from app.core import security
 from app.core.config import settings
 from app.services.email_service import send_email_otp
 
 router = APIRouter()
 
-@router.post("/signup")
+@router.post("/signup", dependencies=[Depends(deps.rate_limit("otp"))])
 def signup(
     user_in: schemas.user.UserCreate,
     db: Session = Depends(deps.get_db)
@@ -63,18 +66,18 @@ def signup(
         email_sent = False
     
     if not email_sent:
-         # Log the OTP so developer can see it
+         # Email queue is full: log the OTP so developer can see it
          print("==================================================")
-         print(f"FAILED TO SEND EMAIL. OTP IS: {otp_code}")
+         print(f"EMAIL QUEUE FULL. OTP IS: {otp_code}")
          print("==================================================")
          return {
-             "message": "Account created. Email sending failed (check server logs/console for OTP).",
-             "warning": "Email failed"
+             "message": "Account created, but the verification email could not be queued. Please request a new code shortly.",
+             "warning": "Email queue full"
          }
 
     return {"message": "Verification code sent to email."}
 
-@router.post("/send-otp")
+@router.post("/send-otp", dependencies=[Depends(deps.rate_limit("otp"))])
 def send_otp(
     otp_in: schemas.otp.OTPRequest,
     db: Session = Depends(deps.get_db)
@@ -140,17 +143,25 @@ def send_otp(
     if email_sent:
         return {"message": "OTP sent successfully."}
     else:
-        # Log the OTP so developer can see it
+        # Email queue is full: log the OTP so developer can see it
          print("==================================================")
-         print(f"FAILED TO SEND EMAIL. OTP IS: {otp_code}")
+         print(f"EMAIL QUEUE FULL. OTP IS: {otp_code}")
          print("==================================================")
          # Don't raise 500, return success so frontend flow continues
          return {
-             "message": "OTP generated but email failed. Check server logs/console for code.",
-             "warning": "Email failed"
+             "message": "OTP generated, but the email could not be queued. Please try again shortly.",
+             "warning": "Email queue full"
          }
 
-@router.post("/verify-otp")
+OTP_ERRORS = {
+    OTP_INVALID: "Invalid OTP",
+    OTP_NOT_FOUND: "No OTP request found",
+    OTP_EXPIRED: "OTP expired",
+    OTP_TOO_MANY_ATTEMPTS: "Too many attempts. Request a new OTP.",
+    OTP_USED: "OTP already used",
+}
+
+@router.post("/verify-otp", dependencies=[Depends(deps.rate_limit("otp"))])
 def verify_otp(
     otp_in: schemas.otp.OTPVerify,
     db: Session = Depends(deps.get_db)
@@ -163,34 +174,11 @@ def verify_otp(
     # if not user:
     #    raise HTTPException(status_code=404, detail="User not found")
         
-    latest_otp = crud.get_latest_otp(db, email=otp_in.email)
-    if not latest_otp:
-        raise HTTPException(status_code=400, detail="No OTP request found")
-        
-    # Check expiry
-    # DB stores datetime with timezone (UTC). We must compare with aware datetime.
-    now = datetime.now(timezone.utc)
-    
-    # Ensure database datetime is treated as aware if it comes back naive (unlikely with this error but safe)
-    otp_expires_at = latest_otp.expires_at
-    if otp_expires_at.tzinfo is None:
-        otp_expires_at = otp_expires_at.replace(tzinfo=timezone.utc)
-        
-    if now > otp_expires_at:
-        raise HTTPException(status_code=400, detail="OTP expired")
-        
-    # Check attempts
-    if latest_otp.attempts >= 5:
-         raise HTTPException(status_code=400, detail="Too many attempts. Request a new OTP.")
-         
-    # Check if used
-    if latest_otp.is_used:
-         raise HTTPException(status_code=400, detail="OTP already used")
-
-    # Verify Hash
-    if not security.verify_password(otp_in.otp, latest_otp.hashed_otp):
-        crud.increment_attempts(db, latest_otp)
-        raise HTTPException(status_code=400, detail="Invalid OTP")
+    # Single conditional UPDATE: marks the OTP used or counts the failed attempt
+    outcome, otp_user_data = crud.consume_otp(db, email=otp_in.email, otp_code=otp_in.otp)
+    if outcome != OTP_VALID:
+        db.commit()  # persist the attempt increment
+        raise HTTPException(status_code=400, detail=OTP_ERRORS[outcome])
         
     # Check if we need to create the user (Deferred Registration)
     if user:
@@ -198,9 +186,9 @@ def verify_otp(
         user.is_verified = True
         user.is_active = True
         db.add(user)
-    elif latest_otp.user_data:
+    elif otp_user_data:
         # Create new user from stored data
-        user_data = dict(latest_otp.user_data) # Copy dict
+        user_data = dict(otp_user_data) # Copy dict
         
         # Extract fields that don't belong to User model
         full_name = user_data.pop("full_name", None)
@@ -208,23 +196,19 @@ def verify_otp(
         # Ensure we don't pass fields that might not be in User model or handle mismatched
         user = models.User(**user_data)
         db.add(user)
-        # We need to commit here to get the user ID for token generation
-        db.commit()
-        db.refresh(user)
+        # Flush to get the user ID; everything commits together below
+        db.flush()
         
         # Create Profile if full_name is present
         if full_name:
             profile = models.Profile(id=user.id, full_name=full_name)
             db.add(profile)
-            db.commit() 
         
     else:
         # User not found and no user_data? Should not happen in new flow
         raise HTTPException(status_code=400, detail="Registration data not found. Please sign up again.")
     
-    # Mark OTP as used
-    crud.mark_otp_as_used(db, latest_otp)
-    
+    # One commit: OTP marked used + user verified/created
     db.commit()
     
     # Generate access token so user is automatically logged in
@@ -239,7 +223,7 @@ def verify_otp(
         "token_type": "bearer"
     }
 
-@router.post("/login/access-token", response_model=schemas.user.Token)
+@router.post("/login/access-token", response_model=schemas.user.Token, dependencies=[Depends(deps.rate_limit("auth"))])
 def login_access_token(
     db: Session = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
@@ -247,8 +231,14 @@ def login_access_token(
     OAuth2 compatible token login, get an access token for future requests
     """
     user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    verified, new_hash = security.verify_and_update_password(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        # Stored hash used older argon2 costs: upgrade it (committed below)
+        user.hashed_password = new_hash
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -292,7 +282,7 @@ from google.auth.transport import requests as google_requests
 class GoogleToken(BaseModel):
     token: str
 
-@router.post("/google-login", response_model=schemas.user.Token)
+@router.post("/google-login", response_model=schemas.user.Token, dependencies=[Depends(deps.rate_limit("auth"))])
 def google_login(
     token_data: GoogleToken,
     db: Session = Depends(deps.get_db)
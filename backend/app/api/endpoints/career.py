@@ -10,7 +10,7 @@ class CareerRequest(BaseModel):
 
 router = APIRouter()
 
-@router.post("/path")
+@router.post("/path", dependencies=[Depends(deps.rate_limit("llm"))])
 async def get_career_path(
     request: CareerRequest,
     current_user = Depends(deps.get_current_active_user),
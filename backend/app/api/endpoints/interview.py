@@ -16,7 +16,7 @@ class FinishRequest(BaseModel):
     position: str
     responses: Dict[str, List[Dict[str, Any]]]
 
-@router.post("/next-question")
+@router.post("/next-question", dependencies=[Depends(deps.rate_limit("llm"))])
 async def get_next_question(
     request: QuestionRequest,
     current_user = Depends(deps.get_current_user_optional),
@@ -29,7 +29,7 @@ async def get_next_question(
     )
     return {"question": question}
 
-@router.post("/analyze")
+@router.post("/analyze", dependencies=[Depends(deps.rate_limit("llm"))])
 async def analyze_interview(
     request: FinishRequest,
     current_user = Depends(deps.get_current_user_optional),
@@ -50,7 +50,7 @@ async def check_interview_unlock(
     return result
 
 
-@router.post("/next-question-advanced")
+@router.post("/next-question-advanced", dependencies=[Depends(deps.rate_limit("llm"))])
 async def get_next_question(
     request: AdvancedQuestionRequest,
     current_user=Depends(deps.get_current_active_user),
@@ -66,7 +66,7 @@ async def get_next_question(
     return {"question": question}
 
 
-@router.post("/finish-advanced")
+@router.post("/finish-advanced", dependencies=[Depends(deps.rate_limit("llm"))])
 async def finish_interview(
     request: AdvancedFinishRequest,
     db: Session = Depends(deps.get_db),
@@ -49,11 +49,12 @@ async def refresh_skill_resources(
     current_user=Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Force-refresh learning resources for a skill (clears cache).
+    Force-refresh learning resources for a skill.
+    Cached resources are returned immediately while the re-fetch runs in
+    the background; the entry is kept if the YouTube quota is used up.
     """
     try:
-        learning_content_service.clear_skill_cache(request.skill_name, db)
-        resources = await learning_content_service.get_learning_resources(
+        resources = await learning_content_service.refresh_learning_resources(
             skill_name=request.skill_name,
             level=request.level,
             db=db
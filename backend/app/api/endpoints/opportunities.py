@@ -25,7 +25,7 @@ class OpportunityFilterRequest(BaseModel):
     limit: int = 20
 
 
-@router.post("/discover")
+@router.post("/discover", dependencies=[Depends(deps.rate_limit("llm"))])
 async def discover_opportunities(
     request: OpportunitySearchRequest,
     db: Session = Depends(deps.get_db),
@@ -17,7 +17,7 @@ class QuizQuestion(BaseModel):
     options: List[str]
     correct: int
 
-@router.post("/generate", response_model=List[QuizQuestion])
+@router.post("/generate", response_model=List[QuizQuestion], dependencies=[Depends(deps.rate_limit("llm"))])
 async def generate_quiz(
     request: QuizRequest,
     current_user = Depends(deps.get_current_user_optional), # Use optional auth
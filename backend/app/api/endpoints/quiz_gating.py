@@ -26,7 +26,7 @@ class QuizSubmission(BaseModel):
     answers: List[dict]  # [{question_id, selected, correct, question_text}]
 
 
-@router.post("/generate-skill-quiz")
+@router.post("/generate-skill-quiz", dependencies=[Depends(deps.rate_limit("llm"))])
 async def generate_skill_quiz(
     request: SkillQuizRequest,
     current_user=Depends(deps.get_current_active_user),
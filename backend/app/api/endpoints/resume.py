@@ -1,19 +1,23 @@
-from typing import Any
+from typing import Any, Optional
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form
 from sqlalchemy.orm import Session
 from app.api import deps
+from app.core.principal_cache import principal_cache
 from app.services import resume_service
 
 router = APIRouter()
 
 from app.models.user import Profile
+from app.services.skill_registry_service import merge_skill_lists
 
 @router.post("/analyze")
 async def analyze_resume(
     file: UploadFile = File(...),
     job_description: str = Form(""),
+    feedback: Optional[bool] = Form(None),
     db: Session = Depends(deps.get_db),
     current_user = Depends(deps.get_current_user_optional),
+    llm_limit: deps.RateLimitCharge = Depends(deps.rate_limit("llm")),
 ) -> Any:
     """
     Upload a resume (PDF) and get AI analysis.
@@ -25,27 +29,51 @@ async def analyze_resume(
         if not file.filename.lower().endswith(".pdf"):
             raise HTTPException(status_code=400, detail="Invalid file type. Only PDF allowed.")
         
-        content = await file.read()
-        if not content:
-            raise HTTPException(status_code=400, detail="The uploaded file is empty.")
-            
-        logger.info(f"Processing resume: {file.filename} ({len(content)} bytes)")
-        
         try:
-            text = await resume_service.extract_text_from_pdf(content)
-        except Exception as e:
-            logger.error(f"Text extraction failed: {str(e)}")
-            raise HTTPException(status_code=400, detail=f"Failed to parse PDF content: {str(e)}")
-        
-        if not text.strip():
-            logger.warning(f"No text extracted from PDF: {file.filename}")
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF. It might be a scanned image or empty.")
-            
-        logger.info(f"Analysis started for {file.filename}")
-        analysis = await resume_service.analyze_resume_with_ai(text, job_description)
-        logger.info(f"Analysis completed for {file.filename}")
-        
-        
+            upload = await resume_service.ingest_pdf_upload(file)
+        except resume_service.UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except resume_service.InvalidPdfUpload as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        try:
+            if not upload.size:
+                raise HTTPException(status_code=400, detail="The uploaded file is empty.")
+
+            logger.info(f"Processing resume: {file.filename} ({upload.size} bytes)")
+            file_hash = upload.sha256
+            jd_hash = resume_service.job_description_hash(job_description)
+
+            analysis = resume_service.get_cached_analysis(file_hash, jd_hash, db)
+            if analysis:
+                logger.info(f"Analysis cache hit for {file.filename}")
+            else:
+                # Same file with a different JD reuses the extracted text
+                text = resume_service.get_cached_text(file_hash, db)
+                if text is None:
+                    try:
+                        text = await resume_service.extract_text_from_pdf(upload.source)
+                    except resume_service.PdfExtractionBusy as e:
+                        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+                    except Exception as e:
+                        logger.error(f"Text extraction failed: {str(e)}")
+                        raise HTTPException(status_code=400, detail=f"Failed to parse PDF content: {str(e)}")
+
+                    if not text.strip():
+                        logger.warning(f"No text extracted from PDF: {file.filename}")
+                        raise HTTPException(status_code=400, detail="Could not extract text from PDF. It might be a scanned image or empty.")
+                    resume_service.store_text(file_hash, text, db)
+
+                logger.info(f"Analysis started for {file.filename}")
+                # Charged per chunk call; the admission unit covers the first one
+                analysis = await resume_service.analyze_resume_with_ai(
+                    text, job_description, feedback, on_llm_calls=lambda n: llm_limit.charge(n - 1)
+                )
+                logger.info(f"Analysis completed for {file.filename}")
+                resume_service.store_analysis(file_hash, jd_hash, analysis, db)
+        finally:
+            upload.cleanup()
+
         # --- NEW: Extract and auto-sync skills to profile ---
         if current_user and analysis and isinstance(analysis, dict):
             matched_skills = analysis.get("keyword_analysis", {}).get("matched", [])
@@ -55,13 +83,11 @@ async def analyze_resume(
                     profile = Profile(id=current_user.id)
                     db.add(profile)
                 
-                current_skills = set(profile.skills or [])
-                new_skills = current_skills.union(set([str(s).strip() for s in matched_skills]))
-                
-                profile.skills = list(new_skills)
+                profile.skills = merge_skill_lists(profile.skills, matched_skills)
                 from sqlalchemy.orm.attributes import flag_modified
                 flag_modified(profile, "skills")
                 db.commit()
+                principal_cache.invalidate_user(current_user.id)
 
         return {
             "filename": file.filename,
@@ -79,8 +105,10 @@ async def analyze_resume_text(
     text: str = Form(...),
     filename: str = Form("resume.txt"),
     job_description: str = Form(""),
+    feedback: Optional[bool] = Form(None),
     db: Session = Depends(deps.get_db),
     current_user = Depends(deps.get_current_user_optional),
+    llm_limit: deps.RateLimitCharge = Depends(deps.rate_limit("llm")),
 ) -> Any:
     """
     Analyze resume text directly (e.g., after client-side OCR).
@@ -93,7 +121,9 @@ async def analyze_resume_text(
             raise HTTPException(status_code=400, detail="Resume text is empty.")
 
         logger.info(f"Analysis started for text from {filename}")
-        analysis = await resume_service.analyze_resume_with_ai(text, job_description)
+        analysis = await resume_service.analyze_resume_with_ai(
+            text, job_description, feedback, on_llm_calls=lambda n: llm_limit.charge(n - 1)
+        )
         logger.info(f"Analysis completed for text from {filename}")
 
         # --- NEW: Extract and auto-sync skills to profile ---
@@ -105,13 +135,11 @@ async def analyze_resume_text(
                     profile = Profile(id=current_user.id)
                     db.add(profile)
                 
-                current_skills = set(profile.skills or [])
-                new_skills = current_skills.union(set([str(s).strip() for s in matched_skills]))
-                
-                profile.skills = list(new_skills)
+                profile.skills = merge_skill_lists(profile.skills, matched_skills)
                 from sqlalchemy.orm.attributes import flag_modified
                 flag_modified(profile, "skills")
                 db.commit()
+                principal_cache.invalidate_user(current_user.id)
 
         return {
             "filename": filename,
@@ -1,6 +1,9 @@
+import json
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 from app.api import deps
 from app.services import resume_builder_service
@@ -57,9 +60,19 @@ class SkillsRequest(BaseModel):
     target_role: str = ""
 
 
+class EnhanceBatchRequest(BaseModel):
+    personal_info: Optional[PersonalInfoRequest] = None
+    education: Optional[EducationRequest] = None
+    experience: Optional[ExperienceRequest] = None
+    projects: Optional[ProjectRequest] = None
+    skills: Optional[SkillsRequest] = None
+    target_role: str = ""
+
+
 class ATSCheckRequest(BaseModel):
     resume_data: Dict[str, Any]
     target_role: str = ""
+    feedback: Optional[bool] = None  # None -> ATS_LLM_FEEDBACK setting
 
 
 class RegenerateRequest(BaseModel):
@@ -68,7 +81,7 @@ class RegenerateRequest(BaseModel):
     target_role: str = ""
 
 
-@router.post("/enhance/personal-info")
+@router.post("/enhance/personal-info", dependencies=[Depends(deps.rate_limit("llm"))])
 async def enhance_personal_info(
     request: PersonalInfoRequest,
     current_user=Depends(deps.get_current_user_optional),
@@ -82,7 +95,7 @@ async def enhance_personal_info(
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
 
-@router.post("/enhance/education")
+@router.post("/enhance/education", dependencies=[Depends(deps.rate_limit("llm"))])
 async def enhance_education(
     request: EducationRequest,
     current_user=Depends(deps.get_current_user_optional),
@@ -96,7 +109,7 @@ async def enhance_education(
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
 
-@router.post("/enhance/experience")
+@router.post("/enhance/experience", dependencies=[Depends(deps.rate_limit("llm"))])
 async def enhance_experience(
     request: ExperienceRequest,
     current_user=Depends(deps.get_current_user_optional),
@@ -110,7 +123,7 @@ async def enhance_experience(
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
 
-@router.post("/enhance/projects")
+@router.post("/enhance/projects", dependencies=[Depends(deps.rate_limit("llm"))])
 async def enhance_projects(
     request: ProjectRequest,
     current_user=Depends(deps.get_current_user_optional),
@@ -124,7 +137,7 @@ async def enhance_projects(
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
 
-@router.post("/enhance/skills")
+@router.post("/enhance/skills", dependencies=[Depends(deps.rate_limit("llm"))])
 async def enhance_skills(
     request: SkillsRequest,
     current_user=Depends(deps.get_current_user_optional),
@@ -138,21 +151,62 @@ async def enhance_skills(
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
 
-@router.post("/ats-check")
+@router.post("/enhance/batch")
+async def enhance_batch(
+    request: EnhanceBatchRequest,
+    current_user=Depends(deps.get_current_user_optional),
+    llm_limit: deps.RateLimitCharge = Depends(deps.rate_limit("llm")),
+) -> Any:
+    """
+    Enhance several sections in one request. Sections run concurrently and
+    are streamed back as NDJSON lines ({"section", "result"} or
+    {"section", "error"}) in the order they finish. Each section is charged
+    as one LLM call.
+    """
+    sections = {}
+    section_roles = {}
+    if request.personal_info:
+        sections["personal_info"] = request.personal_info.dict()
+    for name in ("education", "experience", "projects"):
+        section = getattr(request, name)
+        if section:
+            sections[name] = {"items": [item.dict() for item in section.items]}
+    if request.skills:
+        sections["skills"] = request.skills.dict()
+    if not sections:
+        raise HTTPException(status_code=400, detail="No sections to enhance.")
+    # A section's own target_role wins over the request-level one
+    for name in sections:
+        role = getattr(getattr(request, name), "target_role", "")
+        if role:
+            section_roles[name] = role
+    # One unit was charged on admission; charge the other sections up front
+    llm_limit.charge(len(sections) - 1)
+
+    async def stream():
+        async for item in resume_builder_service.enhance_sections(
+            sections, request.target_role, section_roles
+        ):
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/ats-check", dependencies=[Depends(deps.rate_limit("llm"))])
 async def ats_check(
     request: ATSCheckRequest,
     current_user=Depends(deps.get_current_user_optional),
 ) -> Any:
     try:
         result = await resume_builder_service.run_ats_check(
-            request.resume_data, request.target_role
+            request.resume_data, request.target_role, request.feedback
         )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
 
-@router.post("/regenerate")
+@router.post("/regenerate", dependencies=[Depends(deps.rate_limit("llm"))])
 async def regenerate_section(
     request: RegenerateRequest,
     current_user=Depends(deps.get_current_user_optional),
@@ -175,13 +229,19 @@ class OptimizeRequest(BaseModel):
 @router.post("/optimize")
 async def optimize_resume(
     request: OptimizeRequest,
+    db: Session = Depends(deps.get_db),
     current_user=Depends(deps.get_current_user_optional),
+    llm_limit: deps.RateLimitCharge = Depends(deps.rate_limit("llm")),
 ) -> Any:
     try:
+        # Charged per chunk call; the admission unit covers the first one
         result = await resume_builder_service.optimize_full_resume(
-            request.resume_data, request.target_role, request.template_style
+            request.resume_data, request.target_role, request.template_style, db,
+            on_llm_calls=lambda n: llm_limit.charge(n - 1),
         )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI Error: {str(e)}")
 
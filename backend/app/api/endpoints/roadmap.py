@@ -24,7 +24,7 @@ class SkillUpdateRequest(BaseModel):
     status: str  # "completed", "unlocked", "locked"
 
 
-@router.post("/generate")
+@router.post("/generate", dependencies=[Depends(deps.rate_limit("llm"))])
 async def generate_roadmap(
     request: RoadmapRequest,
     db: Session = Depends(deps.get_db),
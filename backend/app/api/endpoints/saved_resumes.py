@@ -5,8 +5,10 @@ from pydantic import BaseModel, Field
 from typing import Dict, Any
 
 from app.api import deps
+from app.core.principal_cache import principal_cache
 from app.models.resume import SavedResume
 from app.models.user import Profile
+from app.services.skill_registry_service import merge_skill_lists
 
 router = APIRouter()
 
@@ -81,16 +83,15 @@ async def save_resume(
             profile = Profile(id=current_user.id)
             db.add(profile)
             
-        current_skills = set(profile.skills or [])
-        new_skills = current_skills.union(set(extracted_skills))
-        
-        profile.skills = list(new_skills)
+        profile.skills = merge_skill_lists(profile.skills, extracted_skills)
         # SQLAlchemy JSON trick to force update
         from sqlalchemy.orm.attributes import flag_modified
         flag_modified(profile, "skills")
         
     db.commit()
     db.refresh(new_resume)
+    if extracted_skills:
+        principal_cache.invalidate_user(current_user.id)
     
     return {"message": "Resume saved successfully", "id": str(new_resume.id)}
 
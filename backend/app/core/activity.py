@@ -0,0 +1,96 @@
+"""
+Coalesced user activity tracking.
+
+get_current_user records activity here instead of writing
+users.last_active_at on every request, so the auth hot path stays
+read-only:
+- a user is only buffered when their last known activity is older than
+  ACTIVITY_WRITE_THRESHOLD_SECONDS
+- the buffer is written as one bulk UPDATE every ACTIVITY_FLUSH_SECONDS
+  (background job) and on shutdown
+
+Per process; with several workers each flushes its own buffer and the
+UPDATE never moves a timestamp backwards.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import DateTime, column, or_, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    """Thread-safe buffer of user id -> latest activity timestamp."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict = {}
+        # Last timestamp buffered per user, so a stale DB value (or a cached
+        # principal) does not re-buffer the same user on every request
+        self._recent: Dict = {}
+
+    def touch(self, user_id, last_active_at: Optional[datetime] = None, now: Optional[datetime] = None):
+        now = now or datetime.now(timezone.utc)
+        threshold = timedelta(seconds=settings.ACTIVITY_WRITE_THRESHOLD_SECONDS)
+        with self._lock:
+            known = self._recent.get(user_id) or last_active_at
+            if known is not None and now - _aware(known) < threshold:
+                return
+            self._pending[user_id] = now
+            self._recent[user_id] = now
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write buffered timestamps in one UPDATE. Returns the number of users written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.ACTIVITY_WRITE_THRESHOLD_SECONDS)
+            self._recent = {uid: ts for uid, ts in self._recent.items() if ts >= cutoff}
+        if not pending:
+            return 0
+
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            rows = values(
+                column("id", UUID(as_uuid=True)),
+                column("ts", DateTime(timezone=True)),
+                name="activity",
+            ).data(list(pending.items()))
+            stmt = (
+                update(User)
+                .where(User.id == rows.c.id)
+                .where(or_(User.last_active_at == None, User.last_active_at < rows.c.ts))
+                # Activity is not a profile change: keep updated_at as it is
+                .values(last_active_at=rows.c.ts, updated_at=User.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(stmt)
+            db.commit()
+            return len(pending)
+        except Exception as e:
+            logger.error(f"Failed to flush user activity: {e}")
+            db.rollback()
+            # Put the timestamps back for the next flush (newer ones win)
+            with self._lock:
+                for uid, ts in pending.items():
+                    if uid not in self._pending or self._pending[uid] < ts:
+                        self._pending[uid] = ts
+            return 0
+        finally:
+            if own_session:
+                db.close()
+
+
+def _aware(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+# Singleton instance
+activity_buffer = ActivityBuffer()
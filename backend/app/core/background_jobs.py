@@ -2,61 +2,157 @@
 Background jobs scheduler for VidyaMithra.
 Handles:
 - Daily opportunity expiry checks
-- Periodic discovery of new opportunities for common target roles
+- Periodic discovery of new opportunities for the most requested target roles
+- Flushing buffered user activity (last_active_at)
+- Purging used / expired OTPs
+- Refreshing cached admin dashboard statistics
 - Data maintenance
 """
+import asyncio
 import logging
+from datetime import timedelta
+from typing import List
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from app.core.activity import activity_buffer
+from app.core.config import settings
+from app.crud import crud_otp
 from app.db.session import SessionLocal
-from app.services import opportunity_service
+from app.models.career import Roadmap
+from app.services import admin_service, opportunity_service
 from app.api import deps
 
 logger = logging.getLogger(__name__)
 
+def _expire_opportunities() -> int:
+    db: Session = SessionLocal()
+    try:
+        return opportunity_service.cleanup_expired_opportunities(db)
+    finally:
+        db.close()
+
 async def check_expired_opportunities_job():
     """Daily check to mark opportunities as expired."""
     logger.info("Running job: check_expired_opportunities_job")
-    db: Session = SessionLocal()
     try:
-        count = opportunity_service.cleanup_expired_opportunities(db)
+        # Batched UPDATEs run off the event loop
+        count = await asyncio.to_thread(_expire_opportunities)
         logger.info(f"Marked {count} opportunities as expired.")
     except Exception as e:
         logger.error(f"Error in check_expired_opportunities_job: {e}")
-    finally:
-        db.close()
 
-async def refresh_trending_opportunities_job():
-    """Periodic job to discovery new opportunities for trending roles."""
-    logger.info("Running job: refresh_trending_opportunities_job")
-    db: Session = SessionLocal()
-    
-    # Common roles to keep the DB fresh for new users
-    trending_roles = [
-        "Software Engineer",
-        "Data Scientist",
-        "Product Manager",
-        "UX Designer",
-        "DevOps Engineer"
-    ]
-    
-    try:
-        for role in trending_roles:
-            logger.info(f"Discovering opportunities for: {role}")
+# Fallback roles used until enough roadmaps exist to measure demand
+DEFAULT_TRENDING_ROLES = [
+    "Software Engineer",
+    "Data Scientist",
+    "Product Manager",
+    "UX Designer",
+    "DevOps Engineer"
+]
+TRENDING_ROLE_LIMIT = 5
+DISCOVERY_CONCURRENCY = 3
+
+
+def get_trending_roles(db: Session, limit: int = TRENDING_ROLE_LIMIT) -> List[str]:
+    """
+    Most common Roadmap.target_role values (case/whitespace-insensitive).
+    Topped up with DEFAULT_TRENDING_ROLES when there is not enough data.
+    """
+    role_key = func.lower(func.trim(Roadmap.target_role))
+    rows = db.query(
+        func.min(func.trim(Roadmap.target_role)),
+        func.count(Roadmap.id)
+    ).group_by(role_key).order_by(func.count(Roadmap.id).desc()).limit(limit).all()
+
+    roles = [name for name, _ in rows if name]
+    seen = {r.lower() for r in roles}
+    for role in DEFAULT_TRENDING_ROLES:
+        if len(roles) >= limit:
+            break
+        if role.lower() not in seen:
+            roles.append(role)
+            seen.add(role.lower())
+    return roles
+
+
+async def _discover_for_role(role: str, semaphore: asyncio.Semaphore) -> int:
+    """Run discovery for one role with its own DB session."""
+    async with semaphore:
+        logger.info(f"Discovering opportunities for: {role}")
+        db: Session = SessionLocal()
+        try:
             # Use basic skills for general discovery
-            await opportunity_service.generate_opportunities(
+            saved = await opportunity_service.generate_opportunities(
                 target_role=role,
                 skills=[],
                 level="Beginner",
                 db=db
             )
-        logger.info("Trending opportunities refresh completed.")
+            return len(saved)
+        finally:
+            db.close()
+
+
+async def refresh_trending_opportunities_job():
+    """Periodic job to discover new opportunities for the most requested roles."""
+    logger.info("Running job: refresh_trending_opportunities_job")
+    db: Session = SessionLocal()
+    try:
+        trending_roles = get_trending_roles(db)
     except Exception as e:
-        logger.error(f"Error in refresh_trending_opportunities_job: {e}")
+        logger.error(f"Failed to load trending roles, using defaults: {e}")
+        trending_roles = DEFAULT_TRENDING_ROLES[:TRENDING_ROLE_LIMIT]
+    finally:
+        db.close()
+
+    semaphore = asyncio.Semaphore(DISCOVERY_CONCURRENCY)
+    results = await asyncio.gather(
+        *[_discover_for_role(role, semaphore) for role in trending_roles],
+        return_exceptions=True
+    )
+
+    for role, result in zip(trending_roles, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error in refresh_trending_opportunities_job for {role}: {result}")
+        else:
+            logger.info(f"Saved {result} opportunities for {role}")
+    logger.info("Trending opportunities refresh completed.")
+
+def _purge_otps() -> int:
+    db: Session = SessionLocal()
+    try:
+        return crud_otp.purge_otps(
+            db,
+            used_after=timedelta(minutes=settings.OTP_PURGE_USED_AFTER_MINUTES),
+            expired_after=timedelta(hours=settings.OTP_PURGE_EXPIRED_AFTER_HOURS),
+        )
     finally:
         db.close()
 
+async def purge_otps_job():
+    """Delete used and long-expired OTP rows."""
+    try:
+        count = await asyncio.to_thread(_purge_otps)
+        logger.info(f"Purged {count} OTP rows.")
+    except Exception as e:
+        logger.error(f"Error in purge_otps_job: {e}")
+
+async def flush_user_activity_job():
+    """Write buffered last_active_at timestamps in one bulk UPDATE."""
+    count = await asyncio.to_thread(activity_buffer.flush)
+    if count:
+        logger.info(f"Flushed activity for {count} users.")
+
+async def refresh_admin_stats_job():
+    """Recompute the cached admin dashboard counters."""
+    try:
+        await asyncio.to_thread(admin_service.admin_stats.refresh)
+    except Exception as e:
+        logger.error(f"Error in refresh_admin_stats_job: {e}")
+
 def setup_background_jobs():
     """Initialize and start the background scheduler."""
     scheduler = AsyncIOScheduler()
@@ -79,6 +175,33 @@ def setup_background_jobs():
         replace_existing=True
     )
     
+    # 3. Every ACTIVITY_FLUSH_SECONDS: Flush buffered user activity
+    scheduler.add_job(
+        flush_user_activity_job,
+        IntervalTrigger(seconds=settings.ACTIVITY_FLUSH_SECONDS),
+        id="flush_user_activity",
+        name="Flush buffered user activity",
+        replace_existing=True
+    )
+    
+    # 4. Hourly: Purge used / expired OTPs
+    scheduler.add_job(
+        purge_otps_job,
+        CronTrigger(minute=15),
+        id="purge_otps",
+        name="Purge used and expired OTPs hourly",
+        replace_existing=True
+    )
+    
+    # 5. Every ADMIN_STATS_REFRESH_SECONDS: Recompute admin dashboard counters
+    scheduler.add_job(
+        refresh_admin_stats_job,
+        IntervalTrigger(seconds=settings.ADMIN_STATS_REFRESH_SECONDS),
+        id="refresh_admin_stats",
+        name="Refresh admin dashboard statistics",
+        replace_existing=True
+    )
+    
     scheduler.start()
     logger.info("Background scheduler started.")
     return scheduler
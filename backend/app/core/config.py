@@ -19,19 +19,82 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "temporary_secret_for_deployment"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST_KB: int = 19456           # 19 MiB per hash
+    ARGON2_PARALLELISM: int = 1
+    PASSWORD_HASH_WORKERS: int = 4               # Concurrent argon2 hashes/verifies per process
+    OTP_HMAC_KEY: str = ""                       # Defaults to a key derived from SECRET_KEY
+    OTP_PURGE_USED_AFTER_MINUTES: int = 60       # Used OTPs are deleted after this
+    OTP_PURGE_EXPIRED_AFTER_HOURS: int = 24      # Expired OTPs (and pending signup data) after this
+    ACTIVITY_WRITE_THRESHOLD_SECONDS: int = 300  # last_active_at precision
+    ACTIVITY_FLUSH_SECONDS: int = 60             # How often buffered activity is written
+    AUTH_CACHE_TTL_SECONDS: int = 60             # Verified token -> principal cache (0 disables)
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    ADMIN_STATS_MAX_AGE_SECONDS: int = 300       # /admin/stats counters are never older than this
+    ADMIN_STATS_REFRESH_SECONDS: int = 120       # Background recompute interval
+    ADMIN_SEARCH_COUNT_CAP: int = 1000           # Admin user search counts matches up to this
+    ADMIN_EXPORT_CHUNK_SIZE: int = 1000          # Rows fetched per server-side cursor round trip
+
+    # Rate limiting (see app/core/rate_limit.py)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS_URL: str = ""               # Share windows across workers (needs `redis`)
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False # Only behind a proxy that sets X-Forwarded-For
+    RATE_LIMIT_OTP_PER_HOUR: int = 10
+    RATE_LIMIT_AUTH_PER_MINUTE: int = 10
+    RATE_LIMIT_LLM_PER_MINUTE: int = 20
+    RATE_LIMIT_GUEST_LLM_PER_MINUTE: int = 5
+    LLM_DAILY_BUDGET: int = 300                  # LLM-backed requests per user per UTC day
+    LLM_GUEST_DAILY_BUDGET: int = 30             # ... per IP for anonymous/guest callers
     
     # External APIs
     OPENAI_API_KEY: str = ""
     GEMINI_API_KEY: str = ""
     GROQ_API_KEY: str = ""
+    LLM_MAX_CONCURRENCY: int = 8         # Global cap on in-flight LLM calls per process
     YOUTUBE_API_KEY: str = ""
+    YOUTUBE_DAILY_QUOTA: int = 10000     # Quota units per day (per process)
+    YOUTUBE_QUOTA_RESERVE: int = 500     # Units held back before degrading to cache
+    YOUTUBE_PREFETCH_QUOTA: int = 2000   # Max units per day spent on roadmap prefetching
+    YOUTUBE_PREFETCH_MIN_REMAINING: int = 5000  # Prefetch stops when fewer units remain
+    LEARNING_CACHE_TTL_HOURS: int = 168  # Learning resources go stale after 7 days
+    LEARNING_CACHE_LRU_SIZE: int = 512   # In-process entries in front of learning_cache
+    LEARNING_PREFETCH_CONCURRENCY: int = 4  # Parallel YouTube fetches per roadmap prefetch
+    LEARNING_PREFETCH_LEVELS: int = 1    # Roadmap levels prefetched when a roadmap is created
+    OPPORTUNITY_INDEX_REFRESH_SECONDS: int = 60  # Pull opportunities written by other workers
     
+    # Resume uploads
+    RESUME_MAX_UPLOAD_MB: int = 10
+    RESUME_SPOOL_THRESHOLD_KB: int = 1024  # Larger uploads are spooled to a temp file
+
+    # Resume PDF parsing (process pool)
+    PDF_MAX_WORKERS: int = 2
+    PDF_MAX_QUEUE: int = 8               # Extra requests allowed to wait for a worker
+    PDF_QUEUE_TIMEOUT_SECONDS: int = 60  # Max wait for a free worker before answering busy
+    PDF_MAX_PAGES: int = 20
+    PDF_TIMEOUT_SECONDS: int = 15
+    PDF_MAX_MEMORY_MB: int = 512
+    RESUME_CACHE_TTL_DAYS: int = 30      # Reuse extracted text / analyses for this long
+
+    # Resume analysis
+    ATS_LLM_FEEDBACK: bool = True        # Ask the LLM for narrative feedback on top of the local ATS score
+    RESUME_CHUNK_CHARS: int = 3000       # Section-aligned chunk size for LLM resume analysis
+    RESUME_MAX_CHUNKS: int = 4           # Chunks grow beyond RESUME_CHUNK_CHARS to stay under this
+    RESUME_JD_PROMPT_CHARS: int = 3000   # Longer JDs are condensed to their requirement lines
+
     # Email
     SMTP_SERVER: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
     FROM_EMAIL: str = "noreply@example.com"
+    SMTP_STARTTLS: bool = True           # False for a local plain-text stand-in server
+    SMTP_TIMEOUT_SECONDS: int = 15
+    SMTP_IDLE_CHECK_SECONDS: int = 30    # Probe (NOOP) a reused session idle for longer than this
+    EMAIL_BACKEND: str = "auto"          # "auto" (smtp if SMTP_USER is set), "smtp" or "console" (log instead of sending)
+    EMAIL_WORKERS: int = 2               # Sender threads, each with its own SMTP session
+    EMAIL_QUEUE_SIZE: int = 1000
+    EMAIL_MAX_RETRIES: int = 3
+    EMAIL_RETRY_BACKOFF_SECONDS: float = 1.0
     
     # Admin System
     BLACK_ADMIN_EMAILS: str = ""  # Comma-separated emails for permanent super-admin access
@@ -0,0 +1,45 @@
+"""
+Process-wide pooled HTTP client for outbound API calls.
+
+A single httpx.AsyncClient keeps TCP/TLS connections alive between
+requests instead of re-handshaking per call. HTTP/2 is enabled when the
+optional `h2` package is installed (pip install "httpx[http2]").
+"""
+import logging
+from typing import Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=50,
+                max_keepalive_connections=20,
+                keepalive_expiry=60.0
+            ),
+        )
+        logger.info(f"Shared HTTP client created (http2={HTTP2_AVAILABLE})")
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client (called on application shutdown)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,107 @@
+"""
+Short-TTL cache of verified tokens -> user principal.
+
+get_current_user decodes the JWT and looks the user up (by id, then by
+email) on every request. Once a token has resolved to an active,
+non-blacklisted user, the column values of the user and their profile
+are cached under the SHA-256 of the token for AUTH_CACHE_TTL_SECONDS
+(never past the token's own `exp`), so repeat requests need no auth
+queries. Hits rebuild a transient User with its Profile attached, so
+`user.profile` (e.g. /users/me) works as it does for a loaded user.
+
+Admin actions that change who a user is (blacklist, role change,
+deletion) and endpoints that write a user's profile call
+invalidate_user(). That only clears this process: other workers keep
+serving the cached principal, including a blacklisted or demoted one,
+until its TTL expires.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+from app.core.config import settings
+from app.models.user import User, Profile
+
+_USER_COLUMNS = [c.key for c in User.__table__.columns]
+_PROFILE_COLUMNS = [c.key for c in Profile.__table__.columns]
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class PrincipalCache:
+    """Thread-safe LRU of token hash -> (expires_at, user id, user values, profile values)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+
+    def get(self, token: str) -> Optional[User]:
+        """A transient User (with its Profile) built from the cached values, or None."""
+        key = _token_key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user_id, values, profile_values = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+        user = User(**values)
+        if profile_values is not None:
+            # JSONB columns are mutable; never hand out the cached objects
+            user.profile = Profile(**copy.deepcopy(profile_values))
+        return user
+
+    def put(self, token: str, user: User, token_exp: Optional[float] = None):
+        ttl = settings.AUTH_CACHE_TTL_SECONDS
+        if ttl <= 0:
+            return
+        if isinstance(token_exp, (int, float)):
+            ttl = min(ttl, token_exp - time.time())
+            if ttl <= 0:
+                return
+        key = _token_key(token)
+        user_id = str(user.id)
+        values = {name: getattr(user, name) for name in _USER_COLUMNS}
+        profile = user.profile
+        profile_values = (
+            copy.deepcopy({name: getattr(profile, name) for name in _PROFILE_COLUMNS})
+            if profile is not None else None
+        )
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, user_id, values, profile_values)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > settings.AUTH_CACHE_MAX_ENTRIES:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id) -> None:
+        """Forget every cached token for a user."""
+        with self._lock:
+            for key in list(self._by_user.get(str(user_id), ())):
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry[1]]
+
+
+# Singleton instance
+principal_cache = PrincipalCache()
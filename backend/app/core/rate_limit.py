@@ -0,0 +1,190 @@
+"""
+Sliding-window rate limiting and daily LLM budgets.
+
+Limits are per (cost class, identity), where identity is the user id for
+signed-in users and the client IP for anonymous and guest callers:
+- "otp":  signup / send-otp / verify-otp
+- "auth": password and Google login
+- "llm":  endpoints that call the LLM; also counted against a per-day budget.
+          Requests that fan out into several LLM calls are charged per call.
+
+Windows are exact sliding logs. By default they live in process memory;
+set RATE_LIMIT_REDIS_URL (and pip install redis) to share them across
+workers. If Redis is unreachable the in-memory backend is used instead.
+"""
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+def _cost_classes() -> Dict[str, Tuple[int, int]]:
+    """cost class -> (max requests, window seconds) for signed-in users."""
+    return {
+        "otp": (settings.RATE_LIMIT_OTP_PER_HOUR, 3600),
+        "auth": (settings.RATE_LIMIT_AUTH_PER_MINUTE, 60),
+        "llm": (settings.RATE_LIMIT_LLM_PER_MINUTE, 60),
+    }
+
+
+def _guest_cost_classes() -> Dict[str, Tuple[int, int]]:
+    """Tighter LLM limits for anonymous / guest callers (keyed by IP)."""
+    classes = _cost_classes()
+    classes["llm"] = (settings.RATE_LIMIT_GUEST_LLM_PER_MINUTE, 60)
+    return classes
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+# ─── Backends ─────────────────────────────────────────────
+
+class MemoryBackend:
+    """Per-process sliding logs and daily counters."""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logs: Dict[str, Tuple[float, deque]] = {}
+        self._daily: Dict[str, int] = {}
+        self._hits = 0
+
+    def hit(self, key: str, limit: int, window: int, now: float, cost: int = 1) -> Tuple[bool, float]:
+        with self._lock:
+            self._hits += 1
+            if self._hits % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+            entry = self._logs.get(key)
+            log = entry[1] if entry else deque()
+            while log and log[0] <= now - window:
+                log.popleft()
+            self._logs[key] = (window, log)
+            if len(log) + cost > limit:
+                return False, (log[0] + window - now) if log else float(window)
+            log.extend([now] * cost)
+            return True, 0.0
+
+    def incr_daily(self, key: str, cost: int = 1) -> int:
+        with self._lock:
+            self._daily[key] = self._daily.get(key, 0) + cost
+            return self._daily[key]
+
+    def _sweep(self, now: float):
+        self._logs = {
+            k: (w, log) for k, (w, log) in self._logs.items() if log and log[-1] > now - w
+        }
+        today = _today()
+        self._daily = {k: v for k, v in self._daily.items() if k.endswith(today)}
+
+
+_SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local cost = tonumber(ARGV[5])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+if redis.call('ZCARD', key) + cost > limit then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    if #oldest == 0 then
+        return {0, tostring(window)}
+    end
+    return {0, tostring(tonumber(oldest[2]) + window - now)}
+end
+for i = 1, cost do
+    redis.call('ZADD', key, now, ARGV[4] .. ':' .. i)
+end
+redis.call('PEXPIRE', key, math.ceil(window * 1000))
+return {1, '0'}
+"""
+
+
+class RedisBackend:
+    """Shared sliding logs (sorted sets, updated atomically by a Lua script)."""
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(_SLIDING_WINDOW_LUA)
+
+    def hit(self, key: str, limit: int, window: int, now: float, cost: int = 1) -> Tuple[bool, float]:
+        allowed, retry_after = self._script(
+            keys=[f"rl:{key}"], args=[now, window, limit, uuid.uuid4().hex, cost]
+        )
+        return bool(int(allowed)), float(retry_after)
+
+    def incr_daily(self, key: str, cost: int = 1) -> int:
+        pipe = self._client.pipeline()
+        pipe.incrby(f"rl:{key}", cost)
+        pipe.expire(f"rl:{key}", 2 * 86400)
+        return int(pipe.execute()[0])
+
+
+# ─── Limiter ──────────────────────────────────────────────
+
+class RateLimiter:
+    def __init__(self):
+        self._memory = MemoryBackend()
+        self._shared = None
+        if settings.RATE_LIMIT_REDIS_URL:
+            if REDIS_AVAILABLE:
+                self._shared = RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+            else:
+                logger.warning("RATE_LIMIT_REDIS_URL is set but redis is not installed; using in-memory limits")
+
+    def check(self, cost_class: str, identity: str, is_guest: bool, cost: int = 1) -> None:
+        """
+        Record `cost` units (e.g. the number of LLM calls a request makes);
+        raises RateLimitExceeded when over a limit or budget.
+        """
+        if not settings.RATE_LIMIT_ENABLED or cost <= 0:
+            return
+        classes = _guest_cost_classes() if is_guest else _cost_classes()
+        limit, window = classes[cost_class]
+        allowed, retry_after = self._call("hit", f"{cost_class}:{identity}", limit, window, time.time(), cost)
+        if not allowed:
+            raise RateLimitExceeded("Too many requests. Please slow down.", retry_after)
+
+        if cost_class == "llm":
+            budget = settings.LLM_GUEST_DAILY_BUDGET if is_guest else settings.LLM_DAILY_BUDGET
+            used = self._call("incr_daily", f"llm-budget:{identity}:{_today()}", cost)
+            if used > budget:
+                raise RateLimitExceeded("Daily AI usage limit reached. Try again tomorrow.", _seconds_until_midnight())
+
+    def _call(self, method: str, *args):
+        if self._shared is not None:
+            try:
+                return getattr(self._shared, method)(*args)
+            except Exception as e:
+                logger.error(f"Shared rate limit backend failed, using in-memory: {e}")
+        return getattr(self._memory, method)(*args)
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now(timezone.utc)
+    return 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+# Singleton instance
+rate_limiter = RateLimiter()
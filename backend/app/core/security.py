@@ -1,10 +1,27 @@
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Tuple, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST_KB,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# Argon2 is CPU- and memory-heavy: every hash/verify goes through this
+# bounded pool, which caps how many run at once (and so the CPU and
+# memory a login storm can take). The calling request thread still waits
+# for the result; argon2 releases the GIL, so workers run in parallel.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash"
+)
 
 ALGORITHM = "HS256"
 
@@ -19,7 +36,26 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     return encoded_jwt
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _hash_executor.submit(pwd_context.verify, plain_password, hashed_password).result()
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password; when the stored hash uses outdated cost parameters,
+    also return a fresh hash for the caller to store (else None).
+    """
+    return _hash_executor.submit(pwd_context.verify_and_update, plain_password, hashed_password).result()
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _hash_executor.submit(pwd_context.hash, password).result()
+
+# ─── One-time codes ───────────────────────────────────────
+# OTPs are short-lived and attempt-limited, so a keyed HMAC is enough;
+# a slow KDF only burns CPU on every send and verify.
+
+def _otp_key() -> bytes:
+    key = settings.OTP_HMAC_KEY or settings.SECRET_KEY
+    return hmac.new(key.encode("utf-8"), b"otp-hmac-v1", hashlib.sha256).digest()
+
+def hash_otp(email: str, otp_code: str) -> str:
+    message = f"{(email or '').strip().lower()}:{otp_code}".encode("utf-8")
+    return "hmac$" + hmac.new(_otp_key(), message, hashlib.sha256).hexdigest()
@@ -0,0 +1,84 @@
+"""
+Request body size limits enforced before the body is parsed.
+
+FastAPI parses a multipart form (spooling every uploaded file) before
+any dependency or handler runs, so a size check there only happens after
+the whole upload was received. This ASGI middleware rejects oversized
+bodies up front:
+- a Content-Length over the limit is answered with 413 immediately
+- bodies without Content-Length (chunked) are counted as they arrive and
+  the request is cut off with 413 once the limit is passed
+"""
+import json
+from typing import Dict
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class RequestSizeLimitMiddleware:
+    """Per-path body limits: {path: max_bytes}."""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await _send_413(send, max_bytes)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded:
+                # The app turned the aborted read into an error response; send 413 instead
+                if message["type"] == "http.response.start" and not started:
+                    started = True
+                    await _send_413(send, max_bytes)
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            if not started:
+                await _send_413(send, max_bytes)
+
+
+async def _send_413(send, max_bytes: int):
+    body = json.dumps({
+        "detail": f"Upload is too large. Maximum size is {max_bytes / (1024 * 1024):.0f} MB."
+    }).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
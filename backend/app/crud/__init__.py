@@ -1,2 +1,2 @@
 from .crud_user import get_user, get_user_by_email, create_user
-from .crud_otp import create_otp, get_latest_otp, mark_otp_as_used, increment_attempts
+from .crud_otp import create_otp, get_latest_otp, consume_otp, purge_otps
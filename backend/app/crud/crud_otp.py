@@ -1,13 +1,24 @@
+from sqlalchemy import case, delete, or_, select, update
 from sqlalchemy.orm import Session
 from app.models.otp import OTP
-from datetime import datetime, timezone
-from app.core.security import get_password_hash
+from datetime import datetime, timedelta, timezone
+from app.core.security import hash_otp
+
+MAX_OTP_ATTEMPTS = 5
+
+# Outcomes of consume_otp
+OTP_VALID = "valid"
+OTP_INVALID = "invalid"
+OTP_NOT_FOUND = "not_found"
+OTP_EXPIRED = "expired"
+OTP_TOO_MANY_ATTEMPTS = "too_many_attempts"
+OTP_USED = "used"
 
 def create_otp(db: Session, email: str, otp_code: str, expires_at: datetime, user_data: dict = None):
     # Invalidate previous OTPs for this email? Or just create new one.
     # Ideally, we should maybe mark old ones as used or expired.
     # For now, let's just create a new record.
-    hashed_otp = get_password_hash(otp_code)
+    hashed_otp = hash_otp(email, otp_code)
     db_otp = OTP(
         email=email,
         hashed_otp=hashed_otp,
@@ -25,10 +36,64 @@ def create_otp(db: Session, email: str, otp_code: str, expires_at: datetime, use
 def get_latest_otp(db: Session, email: str):
     return db.query(OTP).filter(OTP.email == email).order_by(OTP.created_at.desc()).first()
 
-def mark_otp_as_used(db: Session, otp: OTP):
-    otp.is_used = True
-    db.commit()
+def consume_otp(db: Session, email: str, otp_code: str):
+    """
+    Check a code against the latest OTP for `email` in one conditional
+    UPDATE: a match marks the row used, a mismatch increments attempts,
+    and expired / used / exhausted rows are left untouched.
+    Returns (outcome, user_data). Not committed; the caller commits.
+    """
+    hashed = hash_otp(email, otp_code)
+    matched = OTP.hashed_otp == hashed
+    latest_id = (
+        select(OTP.id).where(OTP.email == email)
+        .order_by(OTP.created_at.desc()).limit(1).scalar_subquery()
+    )
+    row = db.execute(
+        update(OTP)
+        .where(
+            OTP.id == latest_id,
+            OTP.is_used == False,
+            OTP.attempts < MAX_OTP_ATTEMPTS,
+            OTP.expires_at > datetime.now(timezone.utc),
+        )
+        .values(
+            is_used=matched,
+            attempts=case((matched, OTP.attempts), else_=OTP.attempts + 1),
+        )
+        .returning(OTP.is_used, OTP.user_data)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is not None:
+        return (OTP_VALID if row.is_used else OTP_INVALID), row.user_data
 
-def increment_attempts(db: Session, otp: OTP):
-    otp.attempts += 1
-    db.commit()
+    # Nothing updated: read once to report why
+    latest = get_latest_otp(db, email)
+    if not latest:
+        return OTP_NOT_FOUND, None
+    if latest.is_used:
+        return OTP_USED, None
+    if latest.attempts >= MAX_OTP_ATTEMPTS:
+        return OTP_TOO_MANY_ATTEMPTS, None
+    return OTP_EXPIRED, None
+
+def purge_otps(db: Session, used_after: timedelta, expired_after: timedelta, batch_size: int = 1000) -> int:
+    """
+    Delete used OTPs older than `used_after` and any OTP expired for longer
+    than `expired_after`, in batches. Returns the number of rows deleted.
+    """
+    now = datetime.now(timezone.utc)
+    stale = or_(
+        (OTP.is_used == True) & (OTP.created_at < now - used_after),
+        OTP.expires_at < now - expired_after,
+    )
+    total = 0
+    while True:
+        ids = select(OTP.id).where(stale).limit(batch_size)
+        result = db.execute(
+            delete(OTP).where(OTP.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        total += result.rowcount or 0
+        if (result.rowcount or 0) < batch_size:
+            return total
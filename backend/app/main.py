@@ -21,6 +21,18 @@ from app.models.career import (  # New career platform models
 # Create tables on startup
 Base.metadata.create_all(bind=engine)
 
+# Reject oversized resume uploads before the multipart body is parsed
+# (added before CORS so the 413 still carries CORS headers)
+from app.core.upload_limit import RequestSizeLimitMiddleware
+
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    limits={
+        # File limit plus headroom for the other form fields and boundaries
+        f"{settings.API_V1_STR}/resume/analyze": settings.RESUME_MAX_UPLOAD_MB * 1024 * 1024 + 256 * 1024,
+    },
+)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -37,6 +49,16 @@ from app.core.background_jobs import setup_background_jobs
 async def startup_event():
     setup_background_jobs()
 
+from app.core.http_client import close_http_client
+from app.core.activity import activity_buffer
+from app.services.email_service import email_dispatcher
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_http_client()
+    activity_buffer.flush()
+    email_dispatcher.stop()
+
 # Exception Handler for Detailed Logs
 from fastapi import Request
 from fastapi.responses import JSONResponse
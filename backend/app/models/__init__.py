@@ -1,3 +1,3 @@
 from .user import User, Profile, Blacklist
 from .otp import OTP
-from .resume import SavedResume
+from .resume import SavedResume, ResumeTextCache, ResumeAnalysisCache, OptimizedSectionCache
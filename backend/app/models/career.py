@@ -4,7 +4,7 @@ These are ADDITIVE — no existing tables are modified.
 """
 from sqlalchemy import (
     Column, String, Integer, Float, Boolean, DateTime, Text,
-    ForeignKey, UniqueConstraint
+    ForeignKey, UniqueConstraint, Index, text
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
@@ -112,9 +112,22 @@ class Opportunity(Base):
     is_expired = Column(Boolean, default=False)
     location = Column(String, nullable=True)
     salary_range = Column(String, nullable=True)
+    dedupe_key = Column(String, nullable=True, unique=True)  # normalized "title|source"
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Listing and ranking run on the in-process search index, so only the
+    # expiry job and the index's delta refresh need indexes here
+    __table_args__ = (
+        Index(
+            "idx_opportunities_live_deadline",
+            "deadline",
+            postgresql_where=text("is_expired = false AND deadline IS NOT NULL"),
+        ),
+        # Delta refresh of the in-process search index (updated_at >= watermark)
+        Index("idx_opportunities_updated_at", "updated_at"),
+    )
+
 
 class ProgressSnapshot(Base):
     """
@@ -145,8 +158,9 @@ class LearningCache(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     skill_name = Column(String, nullable=False, index=True)
-    level = Column(String, nullable=True)
+    level = Column(String, nullable=False, default="", server_default="")  # "" when no level
     resources = Column(JSONB, default=[])               # [{title, url, type, order}, ...]
+    expires_at = Column(DateTime(timezone=True), nullable=True)  # Stale after this; served while refreshing
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, String, DateTime, Integer, ForeignKey
+from sqlalchemy import Boolean, Column, String, DateTime, Integer, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
@@ -7,10 +7,15 @@ from app.db.base_class import Base
 class OTP(Base):
     __tablename__ = "otps"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    email = Column(String, index=True, nullable=False)
+    email = Column(String, nullable=False)
     hashed_otp = Column(String, nullable=False)
     attempts = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
     is_used = Column(Boolean, default=False)
     user_data = Column(JSONB, nullable=True) # Store temporary registration data
+
+    __table_args__ = (
+        # Latest OTP per email (also serves plain email lookups)
+        Index("idx_otps_email_created", "email", text("created_at DESC")),
+    )
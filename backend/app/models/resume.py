@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, Boolean, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -21,3 +21,43 @@ class SavedResume(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="resumes")
+
+
+class ResumeTextCache(Base):
+    """Extracted PDF text keyed by SHA-256 of the uploaded file bytes."""
+    __tablename__ = "resume_text_cache"
+
+    file_hash = Column(String(64), primary_key=True)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ResumeAnalysisCache(Base):
+    """AI resume analysis keyed by file hash + normalized job description hash."""
+    __tablename__ = "resume_analysis_cache"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    file_hash = Column(String(64), nullable=False, index=True)
+    jd_hash = Column(String(64), nullable=False)
+    analysis = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('file_hash', 'jd_hash', name='uq_resume_analysis_file_jd'),
+    )
+
+
+class OptimizedSectionCache(Base):
+    """Optimized resume entry keyed by (content hash, normalized target role, template style)."""
+    __tablename__ = "optimized_section_cache"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    section_hash = Column(String(64), nullable=False)
+    target_role = Column(String, nullable=False, default="")
+    template_style = Column(String, nullable=False)
+    optimized = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('section_hash', 'target_role', 'template_style', name='uq_optimized_section_key'),
+    )
@@ -0,0 +1,358 @@
+"""
+Admin Service — set-based reads behind the admin user and progress pages.
+
+Each helper takes a page of user ids and answers for all of them in one
+query (DISTINCT ON / GROUP BY over `user_id IN (...)`), so an admin page
+costs a fixed number of queries regardless of its size.
+
+Exports (/admin/export/users) stream one joined query through a
+server-side cursor, so memory stays bounded at any population size.
+
+Dashboard counters (/admin/stats, /admin/command-centre) are computed in
+a single aggregate query and served from `admin_stats`, refreshed by a
+background job and never older than ADMIN_STATS_MAX_AGE_SECONDS.
+"""
+import csv
+import io
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy import func as sql_func, select
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.career import Roadmap, QuizAttempt, ProgressSnapshot
+from app.models.user import User, Profile
+
+logger = logging.getLogger(__name__)
+
+
+def active_roadmaps(db: Session, user_ids: List) -> Dict:
+    """user id -> (target_role, roadmap_data) of the newest active roadmap."""
+    if not user_ids:
+        return {}
+    rows = db.query(
+        Roadmap.user_id, Roadmap.target_role, Roadmap.roadmap_data
+    ).filter(
+        Roadmap.user_id.in_(user_ids),
+        Roadmap.is_active == True
+    ).distinct(Roadmap.user_id).order_by(
+        Roadmap.user_id, Roadmap.created_at.desc()
+    ).all()
+    return {r.user_id: (r.target_role, r.roadmap_data) for r in rows}
+
+
+def latest_snapshots(db: Session, user_ids: List) -> Dict:
+    """user id -> newest ProgressSnapshot."""
+    if not user_ids:
+        return {}
+    rows = db.query(ProgressSnapshot).filter(
+        ProgressSnapshot.user_id.in_(user_ids)
+    ).distinct(ProgressSnapshot.user_id).order_by(
+        ProgressSnapshot.user_id, ProgressSnapshot.snapshot_date.desc()
+    ).all()
+    return {s.user_id: s for s in rows}
+
+
+def quiz_attempt_counts(db: Session, user_ids: List) -> Dict:
+    """user id -> number of quiz attempts."""
+    if not user_ids:
+        return {}
+    rows = db.query(
+        QuizAttempt.user_id, sql_func.count(QuizAttempt.id)
+    ).filter(
+        QuizAttempt.user_id.in_(user_ids)
+    ).group_by(QuizAttempt.user_id).all()
+    return dict(rows)
+
+
+def roadmap_stage(roadmap: Optional[tuple]) -> str:
+    """'Stage N: <role>' for the first level that is not fully completed."""
+    if not roadmap:
+        return "No Roadmap"
+    target_role, roadmap_data = roadmap
+    if not roadmap_data or "levels" not in roadmap_data:
+        return "No Roadmap"
+    levels = roadmap_data["levels"]
+    current_stage = len(levels)  # All completed
+    for idx, lvl in enumerate(levels):
+        if not all(s.get("status") == "completed" for s in lvl.get("skills", [])):
+            current_stage = idx + 1
+            break
+    return f"Stage {current_stage}: {target_role}"
+
+
+def display_name(user: User) -> str:
+    return user.profile.full_name if user.profile and user.profile.full_name else user.email.split("@")[0]
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def user_search_filter(term: str):
+    """
+    Substring match on email or profile full name. Both columns carry
+    gin_trgm_ops indexes; each ILIKE '%term%' runs against its own table
+    and the id sets are unioned, so both stay index scans (an OR across a
+    join cannot use either index) for terms of three or more characters.
+    """
+    pattern = _like_pattern(term)
+    return User.id.in_(
+        select(User.id).where(User.email.ilike(pattern, escape="\\")).union(
+            select(Profile.id).where(Profile.full_name.ilike(pattern, escape="\\"))
+        )
+    )
+
+
+def windowed_count(query, cap: int) -> Tuple[int, bool]:
+    """(count, exact): counts at most `cap` + 1 rows instead of every match."""
+    window = query.with_entities(User.id).limit(cap + 1).subquery()
+    count = query.session.query(sql_func.count()).select_from(window).scalar()
+    return min(count, cap), count <= cap
+
+
+def user_rows(db: Session, users: Iterable[User]) -> List[dict]:
+    """Admin user-list rows with roadmap stage and latest snapshot (2 queries)."""
+    users = list(users)
+    ids = [u.id for u in users]
+    roadmaps = active_roadmaps(db, ids)
+    snapshots = latest_snapshots(db, ids)
+
+    result = []
+    for u in users:
+        snap = snapshots.get(u.id)
+        result.append({
+            "id": str(u.id),
+            "email": u.email,
+            "role": u.role or "user",
+            "is_active": u.is_active,
+            "is_blacklisted": u.is_blacklisted,
+            "last_active_at": u.last_active_at.isoformat() if u.last_active_at else None,
+            "created_at": u.created_at.isoformat() if u.created_at else None,
+            "full_name": display_name(u),
+            "progress_status": roadmap_stage(roadmaps.get(u.id)),
+            "career_score": snap.career_readiness_score if snap else 0.0,
+            "quizzes_passed": snap.total_quizzes_passed if snap else 0,
+            "interviews_done": snap.total_interviews_done if snap else 0,
+        })
+    return result
+
+
+def progress_rows(db: Session, users: Iterable[User]) -> List[dict]:
+    """Admin progress rows with quiz counts and latest snapshot (2 queries)."""
+    users = list(users)
+    ids = [u.id for u in users]
+    quiz_counts = quiz_attempt_counts(db, ids)
+    snapshots = latest_snapshots(db, ids)
+
+    result = []
+    for u in users:
+        snap = snapshots.get(u.id)
+        result.append({
+            "id": str(u.id),
+            "email": u.email,
+            "full_name": display_name(u),
+            "role": u.role or "user",
+            "quiz_attempts": quiz_counts.get(u.id, 0),
+            "last_active_at": u.last_active_at.isoformat() if u.last_active_at else None,
+            "progress_data": {
+                "overall_score": snap.career_readiness_score or 0,
+                "skills_count": snap.total_skills_completed or 0,
+            } if snap else None,
+        })
+    return result
+
+
+# ─── Export ───────────────────────────────────────────────
+
+EXPORT_COLUMNS = [
+    "id", "email", "full_name", "role", "is_active", "is_blacklisted",
+    "created_at", "last_active_at", "progress_status", "career_score",
+    "resume_ats_score", "skill_completion_pct", "quizzes_passed",
+    "interviews_done", "snapshot_date",
+]
+
+
+def _export_query(db: Session, chunk_size: int):
+    """Users + newest active roadmap + latest snapshot, streamed in chunks."""
+    roadmap = db.query(
+        Roadmap.user_id, Roadmap.target_role, Roadmap.roadmap_data
+    ).filter(
+        Roadmap.is_active == True
+    ).distinct(Roadmap.user_id).order_by(
+        Roadmap.user_id, Roadmap.created_at.desc()
+    ).subquery()
+    snap = db.query(
+        ProgressSnapshot.user_id,
+        ProgressSnapshot.career_readiness_score,
+        ProgressSnapshot.resume_ats_score,
+        ProgressSnapshot.skill_completion_pct,
+        ProgressSnapshot.total_quizzes_passed,
+        ProgressSnapshot.total_interviews_done,
+        ProgressSnapshot.snapshot_date,
+    ).distinct(ProgressSnapshot.user_id).order_by(
+        ProgressSnapshot.user_id, ProgressSnapshot.snapshot_date.desc()
+    ).subquery()
+    return db.query(
+        User.id, User.email, User.role, User.is_active, User.is_blacklisted,
+        User.created_at, User.last_active_at, Profile.full_name,
+        roadmap.c.target_role, roadmap.c.roadmap_data,
+        snap.c.career_readiness_score, snap.c.resume_ats_score,
+        snap.c.skill_completion_pct, snap.c.total_quizzes_passed,
+        snap.c.total_interviews_done, snap.c.snapshot_date,
+    ).outerjoin(
+        Profile, Profile.id == User.id
+    ).outerjoin(
+        roadmap, roadmap.c.user_id == User.id
+    ).outerjoin(
+        snap, snap.c.user_id == User.id
+    ).order_by(User.created_at.desc()).yield_per(chunk_size)
+
+
+def _export_record(row) -> dict:
+    return {
+        "id": str(row.id),
+        "email": row.email,
+        "full_name": row.full_name or row.email.split("@")[0],
+        "role": row.role or "user",
+        "is_active": row.is_active,
+        "is_blacklisted": row.is_blacklisted,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "last_active_at": row.last_active_at.isoformat() if row.last_active_at else None,
+        "progress_status": roadmap_stage((row.target_role, row.roadmap_data)),
+        "career_score": row.career_readiness_score,
+        "resume_ats_score": row.resume_ats_score,
+        "skill_completion_pct": row.skill_completion_pct,
+        "quizzes_passed": row.total_quizzes_passed,
+        "interviews_done": row.total_interviews_done,
+        "snapshot_date": row.snapshot_date.isoformat() if row.snapshot_date else None,
+    }
+
+
+# Leading characters spreadsheets treat as the start of a formula
+_CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_safe(record: dict) -> dict:
+    """Quote user-controlled text so a cell like '=HYPERLINK(...)' opens as text."""
+    return {
+        k: f"'{v}" if isinstance(v, str) and v.startswith(_CSV_FORMULA_PREFIXES) else v
+        for k, v in record.items()
+    }
+
+
+def stream_user_export(fmt: str = "csv", chunk_size: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the user export as CSV or NDJSON text, one chunk of rows at a time.
+    Uses its own session: the response outlives the request's dependencies.
+    """
+    chunk_size = chunk_size or settings.ADMIN_EXPORT_CHUNK_SIZE
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS) if fmt == "csv" else None
+        if writer:
+            writer.writeheader()
+        count = 0
+        for row in _export_query(db, chunk_size):
+            record = _export_record(row)
+            if writer:
+                writer.writerow(_csv_safe(record))
+            else:
+                buffer.write(json.dumps(record) + "\n")
+            count += 1
+            if count % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        logger.info(f"Exported {count} users as {fmt}")
+    finally:
+        db.close()
+
+
+# ─── Dashboard Stats ──────────────────────────────────────
+
+def compute_user_stats(db: Session) -> dict:
+    """All dashboard counters in one pass over users."""
+    now = datetime.now(timezone.utc)
+    row = db.query(
+        sql_func.count(User.id),
+        sql_func.count(User.id).filter(User.last_active_at >= now - timedelta(days=7)),
+        sql_func.count(User.id).filter(User.last_active_at >= now - timedelta(days=30)),
+        sql_func.count(User.id).filter(User.is_blacklisted == True),
+        sql_func.count(User.id).filter(User.role == "admin"),
+    ).one()
+    return {
+        "total_users": row[0],
+        "active_users_7d": row[1],
+        "active_users_30d": row[2],
+        "blacklisted_users": row[3],
+        "admin_count": row[4],
+    }
+
+
+class AdminStatsCache:
+    """
+    Process-wide cache of compute_user_stats with a staleness bound.
+
+    invalidate() only clears this process's copy: other workers keep
+    serving their counters until they refresh or hit the max age.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Optional[dict] = None
+        self._computed_at = 0.0
+        self._as_of: Optional[datetime] = None
+        # Bumped by invalidate(); a refresh that started before it is discarded
+        self._generation = 0
+
+    def get(self, db: Session) -> dict:
+        """Cached counters plus `stats_as_of`; recomputed inline only when too old."""
+        # Held while recomputing, so concurrent stale reads share one query
+        with self._lock:
+            if not self._fresh():
+                self._store(compute_user_stats(db))
+            return {**self._stats, "stats_as_of": self._as_of.isoformat()}
+
+    def refresh(self, db: Optional[Session] = None) -> None:
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            with self._lock:
+                generation = self._generation
+            stats = compute_user_stats(db)
+            with self._lock:
+                if generation == self._generation:
+                    self._store(stats)
+        finally:
+            if own_session:
+                db.close()
+
+    def invalidate(self) -> None:
+        """Force the next read to recompute (after admin changes to users)."""
+        with self._lock:
+            self._generation += 1
+            self._stats = None
+
+    def _fresh(self) -> bool:
+        return (
+            self._stats is not None
+            and time.monotonic() - self._computed_at < settings.ADMIN_STATS_MAX_AGE_SECONDS
+        )
+
+    def _store(self, stats: dict) -> None:
+        self._stats = stats
+        self._computed_at = time.monotonic()
+        self._as_of = datetime.now(timezone.utc)
+
+
+# Singleton instance
+admin_stats = AdminStatsCache()
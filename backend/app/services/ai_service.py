@@ -18,6 +18,7 @@ class AIService:
         # Initialize Groq (New Primary)
         self.mock_client = True
         self.last_error = None  # To store the last exception for debugging in UI
+        self._limiter: Optional[asyncio.Semaphore] = None
         self.groq_client = None
         raw_key = settings.GROQ_API_KEY or HARDCODED_KEY
         groq_api_key = raw_key.strip() if raw_key else None
@@ -48,7 +49,18 @@ class AIService:
             except Exception as e:
                 logger.error(f"Failed to configure Gemini: {str(e)}")
 
+    def _get_limiter(self) -> asyncio.Semaphore:
+        """Process-wide cap on in-flight LLM calls (created lazily inside the event loop)."""
+        if self._limiter is None:
+            self._limiter = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        return self._limiter
+
     async def chat_completion(self, messages: List[Dict[str, str]], system_prompt: Optional[str] = None) -> str:
+        """Run a completion under the global LLM concurrency limiter."""
+        async with self._get_limiter():
+            return await self._chat_completion(messages, system_prompt)
+
+    async def _chat_completion(self, messages: List[Dict[str, str]], system_prompt: Optional[str] = None) -> str:
         """
         Attempts to get a completion from Groq (Primary), 
         fails over to Gemini, then OpenAI, 
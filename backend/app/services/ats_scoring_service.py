@@ -0,0 +1,397 @@
+"""
+ATS Scoring Engine — local, deterministic resume scoring.
+
+Scores a resume in milliseconds without an LLM call:
+1. Keywords: skills found in the resume vs. the job description
+   (or a role vocabulary when no JD is given), via the skill registry.
+2. Sections: summary / experience / education / skills / projects.
+3. Bullets: bullet count, action-verb openers, quantified results.
+4. Formatting: contact details, length, line length, shouting.
+
+The LLM is only used for narrative feedback on top of this score
+(see resume_service.analyze_resume_with_ai and
+resume_builder_service.run_ats_check).
+"""
+import re
+from typing import Dict, List, Tuple
+from app.services.skill_registry_service import canonicalize, canonicalize_list, is_known, skill_id
+
+# ─── Score weights (sum to 100) ───────────────────────────
+WEIGHTS = {
+    "keywords": 40,
+    "sections": 20,
+    "bullets": 20,
+    "formatting": 20,
+}
+
+# ─── Role vocabularies (canonical skill names) ────────────
+# Matched by substring against the lowercased target role, first hit wins.
+ROLE_KEYWORDS = [
+    (("machine learning", "ml engineer", "ai engineer"), [
+        "Python", "Machine Learning", "Deep Learning", "PyTorch", "TensorFlow",
+        "Scikit-learn", "NumPy", "Pandas", "SQL", "Docker", "Git",
+    ]),
+    (("data scien",), [
+        "Python", "SQL", "Machine Learning", "Pandas", "NumPy", "Scikit-learn",
+        "Statistics", "Data Visualization", "Deep Learning", "Git",
+    ]),
+    (("data analyst", "business analyst"), [
+        "SQL", "Excel", "Python", "Pandas", "Tableau", "Power BI",
+        "Statistics", "Data Visualization",
+    ]),
+    (("devops", "site reliability", "sre", "cloud engineer"), [
+        "Linux", "Docker", "Kubernetes", "CI/CD", "Amazon Web Services",
+        "Terraform", "Git", "Python", "Bash", "Monitoring",
+    ]),
+    (("frontend", "front end", "front-end", "ui developer"), [
+        "JavaScript", "TypeScript", "React", "HTML & CSS", "Redux",
+        "Next.js", "Tailwind CSS", "Git", "REST APIs", "Testing",
+    ]),
+    (("backend", "back end", "back-end"), [
+        "Python", "Java", "Node.js", "SQL", "PostgreSQL", "REST APIs",
+        "Docker", "Git", "Microservices", "Redis",
+    ]),
+    (("full stack", "full-stack", "fullstack"), [
+        "JavaScript", "TypeScript", "React", "Node.js", "HTML & CSS", "SQL",
+        "REST APIs", "Git", "Docker", "MongoDB",
+    ]),
+    (("product manager", "product owner"), [
+        "Product Strategy", "Roadmapping", "Agile", "Stakeholder Management",
+        "User Research", "Analytics", "SQL", "A/B Testing",
+    ]),
+    (("designer", "ux", "ui/ux"), [
+        "Figma", "User Research", "Wireframing", "Prototyping",
+        "User Experience", "User Interface", "Design Systems", "Usability Testing",
+    ]),
+    (("software", "developer", "engineer", "programmer"), [
+        "Data Structures and Algorithms", "Object Oriented Programming", "Git",
+        "SQL", "REST APIs", "Python", "Java", "JavaScript", "Testing", "Docker",
+    ]),
+]
+
+ACTION_VERBS = {
+    "achieved", "analyzed", "architected", "automated", "built", "collaborated",
+    "configured", "created", "decreased", "delivered", "deployed", "designed",
+    "developed", "drove", "enhanced", "engineered", "established", "evaluated",
+    "executed", "facilitated", "generated", "guided", "identified", "implemented",
+    "improved", "increased", "integrated", "introduced", "launched", "led",
+    "maintained", "managed", "mentored", "migrated", "modernized", "monitored",
+    "optimized", "orchestrated", "organized", "owned", "planned", "presented",
+    "produced", "programmed", "reduced", "refactored", "researched", "resolved",
+    "scaled", "shipped", "simplified", "spearheaded", "streamlined", "supported",
+    "tested", "trained", "transformed", "upgraded", "wrote",
+}
+
+SECTION_PATTERNS = {
+    "summary": r"(professional\s+)?summary|profile|objective|about\s+me",
+    "experience": r"(work\s+|professional\s+)?experience|employment(\s+history)?|work\s+history|internships?",
+    "education": r"education|academics?|academic\s+background|qualifications",
+    "skills": r"(technical\s+|core\s+|key\s+)?skills|technologies|tech\s+stack|competencies",
+    "projects": r"(personal\s+|academic\s+|key\s+)?projects",
+    "certifications": r"certifications?|licenses|courses",
+}
+REQUIRED_SECTIONS = ["experience", "education", "skills"]
+RECOMMENDED_SECTIONS = ["summary", "projects"]
+
+_SECTION_RES = {
+    name: re.compile(rf"^\W*({pattern})\W*$", re.IGNORECASE)
+    for name, pattern in SECTION_PATTERNS.items()
+}
+_BULLET_RE = re.compile(r"^\s*([•\-\*▪●◦–·]|\d+[.)])\s+")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE_RE = re.compile(r"(\+?\d[\d\s().-]{7,}\d)")
+_QUANT_RE = re.compile(r"\d+\s*%|\$\s?\d|\b\d{2,}\b|\b\d+(\.\d+)?\s*(x|k|m|ms|hrs?|hours|users|clients)\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#./&-]*")
+
+# Short aliases that are also common words/abbreviations: only counted
+# when not written in all-lowercase (e.g. "Go", "ML", "REST").
+_CASE_SENSITIVE_TERMS = {"go", "rest", "express", "node", "ai", "ml", "dl", "ui", "ux", "js", "ts", "py", "torch"}
+_EXCLUDED_TERMS = {"cv"}  # "CV" almost always means the resume itself
+_MAX_NGRAM = 4
+
+
+def extract_skills(text: str) -> List[str]:
+    """Known skills mentioned in free text, canonical names, in order of appearance."""
+    words = [w.rstrip(".,;:") for w in _WORD_RE.findall(text or "")]
+    words = [w for w in words if w]
+    found = []
+    i = 0
+    while i < len(words):
+        for n in range(min(_MAX_NGRAM, len(words) - i), 0, -1):
+            phrase = " ".join(words[i:i + n])
+            lowered = phrase.lower()
+            if n == 1 and (lowered in _EXCLUDED_TERMS or (lowered in _CASE_SENSITIVE_TERMS and phrase == lowered)):
+                continue
+            if is_known(phrase):
+                found.append(canonicalize(phrase))
+                i += n
+                break
+        else:
+            i += 1
+    return canonicalize_list(found)
+
+
+def role_keywords(target_role: str) -> List[str]:
+    role = (target_role or "").lower()
+    if not role:
+        return []
+    for needles, keywords in ROLE_KEYWORDS:
+        if any(n in role for n in needles):
+            return keywords
+    return []
+
+
+def _heading_name(line: str):
+    """Section name if the line is a section heading, else None."""
+    stripped = line.strip()
+    if not stripped or len(stripped.split()) > 5:
+        return None
+    for name, regex in _SECTION_RES.items():
+        if regex.match(stripped):
+            return name
+    return None
+
+
+def detect_sections(text: str) -> List[str]:
+    found = []
+    for line in (text or "").splitlines():
+        name = _heading_name(line)
+        if name and name not in found:
+            found.append(name)
+    return found
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split resume text at section headings into (section_name, text) pairs
+    in document order. Text before the first heading is the "header"
+    (name, contact details); a repeated heading starts a new pair.
+    """
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in (text or "").splitlines():
+        name = _heading_name(line)
+        if name:
+            sections.append((name, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, "\n".join(lines).strip()) for name, lines in sections if "\n".join(lines).strip()]
+
+
+def resume_data_to_text(resume_data: dict) -> str:
+    """Render resume-builder JSON as plain resume text with headings and bullets."""
+    data = resume_data or {}
+    lines: List[str] = []
+    personal = data.get("personal") or {}
+    lines += [str(personal.get(k, "")) for k in ("full_name", "email", "phone", "location") if personal.get(k)]
+
+    if personal.get("professional_summary"):
+        lines += ["", "Summary", str(personal["professional_summary"])]
+
+    experience = [e for e in data.get("experience") or [] if isinstance(e, dict) and any(e.values())]
+    if experience:
+        lines += ["", "Experience"]
+        for item in experience:
+            lines.append(" | ".join(str(item.get(k, "")) for k in ("title", "organization", "duration") if item.get(k)))
+            if item.get("description"):
+                lines.append(str(item["description"]))
+            lines += [f"• {b}" for b in item.get("bullets") or [] if b]
+
+    projects = [p for p in data.get("projects") or [] if isinstance(p, dict) and any(p.values())]
+    if projects:
+        lines += ["", "Projects"]
+        for item in projects:
+            tech = item.get("technologies")
+            if isinstance(tech, list):
+                tech = ", ".join(map(str, tech))
+            lines.append(" | ".join(str(v) for v in (item.get("name"), tech) if v))
+            if item.get("description"):
+                lines.append(f"• {item['description']}")
+
+    education = [e for e in data.get("education") or [] if isinstance(e, dict) and any(e.values())]
+    if education:
+        lines += ["", "Education"]
+        for item in education:
+            lines.append(" | ".join(str(item.get(k, "")) for k in ("degree", "institution", "duration") if item.get(k)))
+            if item.get("description"):
+                lines.append(str(item["description"]))
+
+    skills = data.get("skills") or {}
+    if isinstance(skills, dict):
+        skill_items = [*(skills.get("technical_skills") or []), *(skills.get("tools") or []), *(skills.get("soft_skills") or [])]
+        if not skill_items and skills.get("raw_skills"):
+            skill_items = [s.strip() for s in str(skills["raw_skills"]).split(",")]
+    elif isinstance(skills, list):
+        skill_items = skills
+    else:
+        skill_items = []
+    skill_items = [str(s) for s in skill_items if s]
+    if skill_items:
+        lines += ["", "Skills", ", ".join(skill_items)]
+
+    return "\n".join(lines)
+
+
+def _phrase_key(text: str) -> str:
+    return " " + " ".join(w.rstrip(".,;:").lower() for w in _WORD_RE.findall(text or "")) + " "
+
+
+def _score_keywords(text: str, resume_skills: List[str], targets: List[str]) -> Dict:
+    resume_ids = {skill_id(s): s for s in resume_skills}
+    target_ids = {skill_id(t): canonicalize(t) for t in targets}
+    # Targets outside the registry (e.g. "Excel", "Figma") match on the phrase itself
+    resume_phrases = _phrase_key(text)
+    present = {
+        sid for sid, name in target_ids.items()
+        if sid in resume_ids or (not is_known(name) and _phrase_key(name) in resume_phrases)
+    }
+    matched = [name for sid, name in target_ids.items() if sid in present]
+    missing = [name for sid, name in target_ids.items() if sid not in present]
+    extra = [name for sid, name in resume_ids.items() if sid not in target_ids]
+    if target_ids:
+        ratio = len(matched) / len(target_ids)
+    else:
+        # No target vocabulary: reward breadth of recognizable skills
+        ratio = min(1.0, len(resume_skills) / 10)
+    return {"ratio": ratio, "matched": matched, "missing": missing, "extra": extra}
+
+
+def _score_bullets(lines: List[str]) -> Dict:
+    bullets = [_BULLET_RE.sub("", l).strip() for l in lines if _BULLET_RE.match(l)]
+    bullets = [b for b in bullets if b]
+    if not bullets:
+        return {"ratio": 0.0, "count": 0, "action_verb_ratio": 0.0, "quantified_ratio": 0.0}
+    action = sum(1 for b in bullets if b.split()[0].lower().strip(",.:;") in ACTION_VERBS)
+    quantified = sum(1 for b in bullets if _QUANT_RE.search(b))
+    action_ratio = action / len(bullets)
+    quant_ratio = quantified / len(bullets)
+    ratio = 0.4 * min(1.0, len(bullets) / 6) + 0.4 * action_ratio + 0.2 * quant_ratio
+    return {
+        "ratio": ratio,
+        "count": len(bullets),
+        "action_verb_ratio": round(action_ratio, 2),
+        "quantified_ratio": round(quant_ratio, 2),
+    }
+
+
+def _score_formatting(text: str, lines: List[str]) -> Dict:
+    words = _WORD_RE.findall(text)
+    word_count = len(words)
+    has_email = bool(_EMAIL_RE.search(text))
+    has_phone = bool(_PHONE_RE.search(text))
+    if 300 <= word_count <= 1200:
+        length_ok = 1.0
+    elif word_count < 300:
+        length_ok = word_count / 300
+    else:
+        length_ok = max(0.0, 1 - (word_count - 1200) / 1200)
+    long_lines = sum(1 for l in lines if len(l) > 300)
+    caps_words = sum(1 for w in words if len(w) > 3 and w.isupper())
+    checks = {
+        "has_email": has_email,
+        "has_phone": has_phone,
+        "word_count": word_count,
+        "long_paragraphs": long_lines,
+        "all_caps_ratio": round(caps_words / word_count, 2) if word_count else 0.0,
+    }
+    ratio = (
+        0.25 * has_email
+        + 0.15 * has_phone
+        + 0.35 * length_ok
+        + 0.15 * (1.0 if long_lines == 0 else max(0.0, 1 - long_lines / 5))
+        + 0.10 * (1.0 if checks["all_caps_ratio"] < 0.1 else 0.0)
+    )
+    return {"ratio": ratio, **checks}
+
+
+def score_resume(text: str, target_role: str = "", job_description: str = "") -> dict:
+    """
+    Deterministic ATS score for resume text.
+    Keywords come from the JD when given (falling back to the role
+    vocabulary if the JD names fewer than 3 known skills).
+    """
+    text = text or ""
+    lines = [l for l in text.splitlines() if l.strip()]
+
+    targets = extract_skills(job_description) if job_description else []
+    if len(targets) < 3:
+        targets = canonicalize_list([*targets, *role_keywords(target_role)])
+
+    keywords = _score_keywords(text, extract_skills(text), targets)
+    sections_found = detect_sections(text)
+    required = sum(1 for s in REQUIRED_SECTIONS if s in sections_found) / len(REQUIRED_SECTIONS)
+    recommended = sum(1 for s in RECOMMENDED_SECTIONS if s in sections_found) / len(RECOMMENDED_SECTIONS)
+    sections_ratio = 0.75 * required + 0.25 * recommended
+    bullets = _score_bullets(lines)
+    formatting = _score_formatting(text, lines)
+
+    breakdown = {
+        "keywords": round(WEIGHTS["keywords"] * keywords["ratio"], 1),
+        "sections": round(WEIGHTS["sections"] * sections_ratio, 1),
+        "bullets": round(WEIGHTS["bullets"] * bullets["ratio"], 1),
+        "formatting": round(WEIGHTS["formatting"] * formatting["ratio"], 1),
+    }
+    score = int(round(sum(breakdown.values())))
+
+    missing_sections = [s for s in REQUIRED_SECTIONS + RECOMMENDED_SECTIONS if s not in sections_found]
+    strengths, improvements = _summarize(keywords, sections_found, missing_sections, bullets, formatting, bool(targets))
+
+    return {
+        "ats_score": max(0, min(100, score)),
+        "keyword_analysis": {
+            "matched": keywords["matched"] if targets else keywords["extra"],
+            "missing": keywords["missing"],
+            "extra": keywords["extra"] if targets else [],
+        },
+        "sections": {"found": sections_found, "missing": missing_sections},
+        "checks": {
+            "bullet_count": bullets["count"],
+            "action_verb_ratio": bullets["action_verb_ratio"],
+            "quantified_ratio": bullets["quantified_ratio"],
+            **{k: v for k, v in formatting.items() if k != "ratio"},
+        },
+        "breakdown": breakdown,
+        "has_target_keywords": bool(targets),
+        "strengths": strengths,
+        "improvements": improvements,
+    }
+
+
+def _summarize(keywords, sections_found, missing_sections, bullets, formatting, has_targets):
+    strengths: List[str] = []
+    improvements: List[str] = []
+
+    if has_targets:
+        if keywords["ratio"] >= 0.6:
+            strengths.append(f"Strong keyword alignment ({len(keywords['matched'])} of {len(keywords['matched']) + len(keywords['missing'])} target skills).")
+        if keywords["missing"]:
+            improvements.append(f"Add evidence of missing keywords where truthful: {', '.join(keywords['missing'][:6])}.")
+    elif keywords["extra"]:
+        strengths.append(f"Lists {len(keywords['extra'])} recognizable skills.")
+
+    if not [s for s in REQUIRED_SECTIONS if s in missing_sections]:
+        strengths.append("All core sections (experience, education, skills) are present.")
+    for section in missing_sections:
+        improvements.append(f"Add a clearly titled '{section.title()}' section.")
+
+    if bullets["count"] == 0:
+        improvements.append("Use bullet points to describe experience and projects.")
+    else:
+        if bullets["action_verb_ratio"] >= 0.6:
+            strengths.append("Most bullets open with strong action verbs.")
+        else:
+            improvements.append("Start more bullets with action verbs (Developed, Led, Optimized...).")
+        if bullets["quantified_ratio"] >= 0.3:
+            strengths.append("Achievements are backed by numbers.")
+        else:
+            improvements.append("Quantify results (%, time saved, users, revenue) where possible.")
+
+    if not formatting["has_email"] or not formatting["has_phone"]:
+        improvements.append("Include both an email address and a phone number.")
+    if formatting["word_count"] < 300:
+        improvements.append("Resume is short; expand on impact and responsibilities.")
+    elif formatting["word_count"] > 1200:
+        improvements.append("Resume is long; tighten it to the most relevant content.")
+    if formatting["long_paragraphs"]:
+        improvements.append("Break long paragraphs into concise bullets.")
+
+    return strengths, improvements
@@ -1,9 +1,191 @@
+"""
+Email Service — outbound mail sent from a background queue.
+
+Request handlers only enqueue a message (send_email_otp returns as soon
+as it is queued). EMAIL_WORKERS daemon threads drain the queue, each
+keeping one SMTP session open and reusing it across messages; transient
+failures are retried with exponential backoff.
+
+Backends (EMAIL_BACKEND):
+- "auto" (default): "smtp" when SMTP_USER is set, otherwise "console"
+- "console": messages (including OTP codes) are logged, nothing is sent
+- "smtp": always send; use this for a local stand-in such as
+  `python -m aiosmtpd -n -l localhost:1025` with SMTP_STARTTLS=False and
+  an empty SMTP_USER (no login)
+
+Since sending is asynchronous, callers only learn whether a message was
+queued. Final delivery failures are logged together with the caller's
+fallback note (for OTP mail, the code) and counted in status().
+"""
+import logging
+import queue
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import List, Optional, Tuple
 from app.core.config import settings
 
-def send_email_otp(to_email: str, otp_code: str):
+logger = logging.getLogger(__name__)
+
+
+class _SmtpSession:
+    """One reusable SMTP connection (owned by a single worker thread)."""
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def send(self, msg: MIMEMultipart):
+        server = self._connection()
+        server.send_message(msg)
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+        self._server = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is not None:
+            # Servers drop idle sessions; probe before reusing an old one
+            if time.monotonic() - self._last_used < settings.SMTP_IDLE_CHECK_SECONDS:
+                return self._server
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+
+        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        if settings.SMTP_STARTTLS:
+            server.starttls()
+        if settings.SMTP_USER:
+            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        self._server = server
+        return server
+
+
+def _is_permanent(error: Exception) -> bool:
+    """5xx replies (bad recipient, rejected sender, auth) will not succeed on retry."""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPAuthenticationError)):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def email_backend() -> str:
+    """The backend in effect: "auto" resolves to smtp only when SMTP_USER is set."""
+    if settings.EMAIL_BACKEND == "auto":
+        return "smtp" if settings.SMTP_USER else "console"
+    return settings.EMAIL_BACKEND
+
+
+class EmailDispatcher:
+    """In-process queue of outgoing messages drained by worker threads."""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Optional[Tuple[MIMEMultipart, Optional[str]]]]" = queue.Queue(
+            maxsize=settings.EMAIL_QUEUE_SIZE
+        )
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._counts = {"sent": 0, "logged": 0, "failed": 0, "dropped": 0}
+
+    def enqueue(self, msg: MIMEMultipart, fallback_note: Optional[str] = None) -> bool:
+        """
+        Queue a message; False if the queue is full. `fallback_note` is
+        logged if the message is finally undeliverable.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((msg, fallback_note))
+            return True
+        except queue.Full:
+            logger.error(f"Email queue full, dropping message to {msg['To']}")
+            self._count("dropped")
+            return False
+
+    def status(self) -> dict:
+        with self._lock:
+            return {**self._counts, "queued": self._queue.qsize()}
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def stop(self, timeout: float = 10.0):
+        """Let workers finish queued mail, then close their SMTP sessions."""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        with self._lock:
+            if self._workers:
+                return
+            if settings.EMAIL_BACKEND == "auto" and email_backend() == "console":
+                logger.warning("SMTP_USER is not set: emails (and OTP codes) are logged instead of sent")
+            for i in range(settings.EMAIL_WORKERS):
+                worker = threading.Thread(target=self._run, name=f"email-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _run(self):
+        session = _SmtpSession()
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    session.close()
+                    return
+                self._deliver(session, *item)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, session: _SmtpSession, msg: MIMEMultipart, fallback_note: Optional[str]):
+        if email_backend() == "console":
+            logger.info(f"[console email] To: {msg['To']} | Subject: {msg['Subject']}\n{msg.get_payload()[0].get_payload()}")
+            self._count("logged")
+            return
+
+        for attempt in range(settings.EMAIL_MAX_RETRIES + 1):
+            try:
+                session.send(msg)
+                self._count("sent")
+                return
+            except Exception as e:
+                session.close()
+                if _is_permanent(e) or attempt == settings.EMAIL_MAX_RETRIES:
+                    logger.error(f"Failed to send email to {msg['To']} after {attempt + 1} attempt(s): {e}")
+                    if fallback_note:
+                        logger.error(f"Undelivered email to {msg['To']}: {fallback_note}")
+                    self._count("failed")
+                    return
+                delay = settings.EMAIL_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                logger.warning(f"Email to {msg['To']} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+# Singleton instance
+email_dispatcher = EmailDispatcher()
+
+
+def send_email_otp(to_email: str, otp_code: str) -> bool:
+    """
+    Queue the verification email. True once queued (delivery happens in
+    the background); False only when the queue is full.
+    """
     msg = MIMEMultipart()
     msg['From'] = settings.FROM_EMAIL
     msg['To'] = to_email
@@ -20,14 +202,4 @@ def send_email_otp(to_email: str, otp_code: str):
     </html>
     """
     msg.attach(MIMEText(body, 'html'))
-
-    try:
-        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT)
-        server.starttls()
-        server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-        server.sendmail(settings.FROM_EMAIL, to_email, msg.as_string())
-        server.quit()
-        return True
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        return False
+    return email_dispatcher.enqueue(msg, fallback_note=f"OTP is {otp_code}")
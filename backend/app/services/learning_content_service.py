@@ -6,19 +6,111 @@ Process:
 1. Generate an optimized YouTube search query for the skill/topic.
 2. Fetch up to 5 real videos using YouTube Data API v3 (search.list).
 3. Store videoId, title, channelTitle, thumbnail.
-4. Cache results in DB for reuse.
+4. Cache results for reuse: an in-process LRU in front of the
+   learning_cache table, each entry with a TTL. Expired entries are
+   served while a single background refresh runs (stale-while-revalidate).
 5. Frontend displays thumbnail cards → click opens real YouTube URL.
+
+Every search.list call costs quota units. YouTubeQuotaLedger tracks the
+units spent per (Pacific-time) quota day; once the budget minus a reserve
+is used up, lookups degrade to cached results instead of failing.
+Roadmap prefetching draws on its own capped share of the day's quota and
+stops early, so interactive lookups keep most of the budget.
 """
+import asyncio
 import logging
+import threading
 import httpx
-from typing import List
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.db.session import SessionLocal
 from app.models.career import LearningCache
+from app.services.skill_registry_service import canonicalize
+
+try:
+    from zoneinfo import ZoneInfo
+    _QUOTA_TZ = ZoneInfo("America/Los_Angeles")  # YouTube quota resets at midnight PT
+except Exception:
+    _QUOTA_TZ = None
 
 logger = logging.getLogger(__name__)
 
 YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+SEARCH_LIST_COST = 100  # Quota units per search.list request
+
+
+class YouTubeQuotaLedger:
+    """
+    Counts YouTube Data API quota units spent today (per process).
+    Spending is refused once the configured reserve would be breached,
+    or for the rest of the day after the API reports quotaExceeded.
+    """
+
+    def __init__(self, daily_quota: int, reserve: int, prefetch_share: int = 0, prefetch_floor: int = 0):
+        self.daily_quota = daily_quota
+        self.reserve = reserve
+        self.prefetch_share = prefetch_share    # Max units prefetch may spend per day
+        self.prefetch_floor = prefetch_floor    # Prefetch stops once remaining units drop below this
+        self._lock = threading.Lock()
+        self._day = None
+        self._used = 0
+        self._prefetch_used = 0
+
+    def _today(self):
+        return datetime.now(_QUOTA_TZ).date()
+
+    def _roll(self):
+        today = self._today()
+        if self._day != today:
+            self._day = today
+            self._used = 0
+            self._prefetch_used = 0
+
+    def try_consume(self, units: int, prefetch: bool = False) -> bool:
+        """Reserve `units` for a request. Returns False if over budget."""
+        with self._lock:
+            self._roll()
+            if self._used + units > self.daily_quota - self.reserve:
+                return False
+            if prefetch:
+                if self._prefetch_used + units > self.prefetch_share:
+                    return False
+                if self.daily_quota - self._used - units < self.prefetch_floor:
+                    return False
+                self._prefetch_used += units
+            self._used += units
+            return True
+
+    def mark_exhausted(self):
+        """The API says the quota is gone; stop calling until the reset."""
+        with self._lock:
+            self._roll()
+            self._used = self.daily_quota
+
+    def status(self) -> dict:
+        with self._lock:
+            self._roll()
+            return {
+                "day": str(self._day),
+                "used": self._used,
+                "prefetch_used": self._prefetch_used,
+                "daily_quota": self.daily_quota,
+                "remaining": max(0, self.daily_quota - self._used),
+            }
+
+
+youtube_quota = YouTubeQuotaLedger(
+    daily_quota=settings.YOUTUBE_DAILY_QUOTA,
+    reserve=settings.YOUTUBE_QUOTA_RESERVE,
+    prefetch_share=settings.YOUTUBE_PREFETCH_QUOTA,
+    prefetch_floor=settings.YOUTUBE_PREFETCH_MIN_REMAINING
+)
 
 
 def _build_search_query(skill_name: str, level: str) -> str:
@@ -32,16 +124,22 @@ def _build_search_query(skill_name: str, level: str) -> str:
     return f"{skill_name} {level_suffix}"
 
 
-async def _fetch_youtube_videos(query: str, max_results: int = 5) -> List[dict]:
+async def _fetch_youtube_videos(query: str, max_results: int = 5, prefetch: bool = False) -> Optional[List[dict]]:
     """
     Call YouTube Data API v3 search.list to fetch real videos.
-    Returns a list of video objects with real data only.
+    Returns a list of video objects with real data only,
+    or None if the daily quota budget (or the prefetch share) does not
+    allow the call.
     """
     api_key = settings.YOUTUBE_API_KEY
     if not api_key:
         logger.error("YOUTUBE_API_KEY is not configured.")
         return []
 
+    if not youtube_quota.try_consume(SEARCH_LIST_COST, prefetch=prefetch):
+        logger.warning(f"YouTube quota budget reached, skipping search for: {query}")
+        return None
+
     params = {
         "part": "snippet",
         "q": query,
@@ -52,10 +150,10 @@ async def _fetch_youtube_videos(query: str, max_results: int = 5) -> List[dict]:
     }
 
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(YOUTUBE_SEARCH_URL, params=params)
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client()
+        response = await client.get(YOUTUBE_SEARCH_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
 
         videos = []
         for item in data.get("items", []):
@@ -81,55 +179,319 @@ async def _fetch_youtube_videos(query: str, max_results: int = 5) -> List[dict]:
 
     except httpx.HTTPStatusError as e:
         logger.error(f"YouTube API HTTP error: {e.response.status_code} - {e.response.text}")
+        if e.response.status_code == 403 and "quotaExceeded" in e.response.text:
+            youtube_quota.mark_exhausted()
+            return None
         return []
     except Exception as e:
         logger.error(f"YouTube API request failed: {e}")
         return []
 
 
+class _LRUTier:
+    """Small in-process LRU in front of the learning_cache table."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, resources: List[dict], expires_at: datetime):
+        with self._lock:
+            self._data[key] = (resources, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def evict_skill(self, skill_name: str):
+        with self._lock:
+            for key in [k for k in self._data if k[0] == skill_name]:
+                del self._data[key]
+
+
+_memory_cache = _LRUTier(settings.LEARNING_CACHE_LRU_SIZE)
+_inflight: Dict[tuple, asyncio.Task] = {}
+_background_tasks: set = set()
+
+
+def _new_expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(hours=settings.LEARNING_CACHE_TTL_HOURS)
+
+
+def _is_fresh(expires_at: Optional[datetime]) -> bool:
+    if expires_at is None:
+        return False
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at > datetime.now(timezone.utc)
+
+
+def _level_key(level: Optional[str]) -> str:
+    """Cache rows never store NULL levels: NULLs never conflict in the upsert."""
+    return level or ""
+
+
+def _store_cache(skill_name: str, level: str, videos: List[dict], db: Session):
+    """Upsert the cache row for (skill_name, level) and the in-process tier."""
+    _store_cache_bulk({(skill_name, level): videos}, db)
+
+
+def _store_cache_bulk(entries: Dict[tuple, List[dict]], db: Session):
+    """Upsert many (skill_name, level) rows in one statement."""
+    if not entries:
+        return
+    expires_at = _new_expiry()
+    for key, videos in entries.items():
+        _memory_cache.put(key, videos, expires_at)
+    try:
+        stmt = pg_insert(LearningCache).values([
+            {
+                "skill_name": skill_name,
+                "level": _level_key(level),
+                "resources": videos,
+                "expires_at": expires_at
+            }
+            for (skill_name, level), videos in entries.items()
+        ])
+        # Conflict target by columns: databases built from the SQL migrations
+        # have an unnamed UNIQUE(skill_name, level)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LearningCache.skill_name, LearningCache.level],
+            set_={
+                "resources": stmt.excluded.resources,
+                "expires_at": stmt.excluded.expires_at,
+                "created_at": func.now()
+            }
+        )
+        db.execute(stmt)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failed to cache resources: {e}")
+        db.rollback()
+
+
+def _fallback_resources(skill_name: str, db: Session) -> List[dict]:
+    """Best cached resources for a skill at any level (used when out of quota)."""
+    fallback = db.query(LearningCache).filter(
+        LearningCache.skill_name == skill_name
+    ).order_by(LearningCache.created_at.desc()).first()
+    return fallback.resources if fallback and fallback.resources else []
+
+
+async def _fetch_and_store(skill_name: str, level: str) -> Optional[List[dict]]:
+    """
+    Fetch from YouTube and write both cache tiers using a dedicated session
+    (callers may outlive the request-scoped one). None means out of quota.
+    """
+    query = _build_search_query(skill_name, level)
+    videos = await _fetch_youtube_videos(query, max_results=5)
+    if videos:
+        db = SessionLocal()
+        try:
+            _store_cache(skill_name, level, videos, db)
+        finally:
+            db.close()
+    return videos
+
+
+def _single_flight(skill_name: str, level: str) -> asyncio.Task:
+    """
+    Share one upstream fetch between all concurrent callers for a key.
+    Waiters must await it through asyncio.shield, so one cancelled caller
+    (client disconnect, timeout) does not cancel the fetch for the rest.
+    """
+    key = (skill_name, level)
+    task = _inflight.get(key)
+    if task is None or task.done():
+        task = asyncio.ensure_future(_fetch_and_store(skill_name, level))
+        _inflight[key] = task
+        task.add_done_callback(lambda t, k=key: _inflight.pop(k, None) if _inflight.get(k) is t else None)
+    return task
+
+
+def _revalidate_in_background(skill_name: str, level: str):
+    """Stale-while-revalidate: refresh an expired entry without blocking."""
+    task = _single_flight(skill_name, level)
+    if task not in _background_tasks:
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        task.add_done_callback(_log_background_error)
+
+
+def _log_background_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        logger.error(f"Background learning refresh failed: {task.exception()}")
+
+
+def _lookup_cached(skill_name: str, level: str, db: Session):
+    """
+    Two-tier lookup. Returns (resources, is_fresh) or (None, False).
+    A stale in-process entry is re-read from learning_cache first: another
+    worker may already have refreshed the row, and only a stale row is
+    worth a YouTube call.
+    """
+    key = (skill_name, level)
+    entry = _memory_cache.get(key)
+    if entry is not None and _is_fresh(entry[1]):
+        return entry[0], True
+
+    cached = db.query(LearningCache).filter(
+        LearningCache.skill_name == skill_name,
+        LearningCache.level == level
+    ).first()
+    if cached and cached.resources:
+        expires_at = cached.expires_at
+        if expires_at is None and cached.created_at is not None:
+            # Rows written before TTLs existed age from their creation time
+            expires_at = cached.created_at + timedelta(hours=settings.LEARNING_CACHE_TTL_HOURS)
+        _memory_cache.put(key, cached.resources, expires_at)
+        return cached.resources, _is_fresh(expires_at)
+
+    if entry is not None:
+        # Row gone (e.g. cleared elsewhere): serve the stale copy and refresh
+        return entry[0], False
+    return None, False
+
+
 async def get_learning_resources(
     skill_name: str,
     level: str,
     db: Session
 ) -> List[dict]:
     """
-    Get real YouTube videos for a skill. Checks cache first,
-    fetches from YouTube Data API v3 if not cached.
+    Get real YouTube videos for a skill.
+    In-process LRU first, then the learning_cache table, then the
+    YouTube Data API v3. Expired entries are served immediately while
+    a single background refresh runs.
     """
-    # 1. Check cache
-    cached = db.query(LearningCache).filter(
-        LearningCache.skill_name == skill_name,
-        LearningCache.level == level
-    ).first()
+    skill_name = canonicalize(skill_name)
+    level = _level_key(level)
 
-    if cached and cached.resources:
-        logger.info(f"Cache hit for {skill_name}/{level}")
-        return cached.resources
+    # 1. Check cache (memory → DB)
+    resources, fresh = _lookup_cached(skill_name, level, db)
+    if resources:
+        if fresh:
+            logger.info(f"Cache hit for {skill_name}/{level}")
+        else:
+            logger.info(f"Stale cache hit for {skill_name}/{level}, revalidating in background")
+            _revalidate_in_background(skill_name, level)
+        return resources
 
-    # 2. Build search query and fetch from YouTube API
+    # 2. Cache miss: one shared upstream fetch per key
     logger.info(f"Cache miss for {skill_name}/{level}, fetching from YouTube API...")
-    query = _build_search_query(skill_name, level)
-    videos = await _fetch_youtube_videos(query, max_results=5)
+    videos = await asyncio.shield(_single_flight(skill_name, level))
 
-    # 3. Cache the result (only if we got real data)
-    if videos:
-        try:
-            cache_entry = LearningCache(
-                skill_name=skill_name,
-                level=level,
-                resources=videos
-            )
-            db.merge(cache_entry)
-            db.commit()
-        except Exception as e:
-            logger.error(f"Failed to cache resources: {e}")
-            db.rollback()
+    if videos is None:
+        # Out of quota: degrade to whatever we have cached for this skill
+        return _fallback_resources(skill_name, db)
 
     return videos
 
 
+async def refresh_learning_resources(
+    skill_name: str,
+    level: str,
+    db: Session
+) -> List[dict]:
+    """
+    Manual refresh. If anything is cached it is returned immediately and
+    the re-fetch runs in the background; the entry is only replaced once
+    fresh results arrive, so running out of quota never loses data.
+    """
+    skill_name = canonicalize(skill_name)
+    level = _level_key(level)
+    resources, _ = _lookup_cached(skill_name, level, db)
+    if resources:
+        _revalidate_in_background(skill_name, level)
+        return resources
+
+    return await get_learning_resources(skill_name, level, db)
+
+
+async def prefetch_learning_resources(skills: List[tuple]) -> int:
+    """
+    Warm the cache for many (skill_name, level) pairs at once.
+    Fresh entries are skipped, missing ones are fetched with bounded
+    concurrency and written back in a single bulk upsert.
+    Returns the number of entries written.
+    """
+    keys = list(dict.fromkeys((canonicalize(name), _level_key(level)) for name, level in skills if name))
+    if not keys:
+        return 0
+
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        names = {name for name, _ in keys}
+        rows = db.query(LearningCache.skill_name, LearningCache.level).filter(
+            LearningCache.skill_name.in_(names),
+            LearningCache.expires_at > now
+        ).all()
+        fresh = {(r.skill_name, r.level) for r in rows}
+        missing = [k for k in keys if k not in fresh]
+        if not missing:
+            return 0
+
+        semaphore = asyncio.Semaphore(settings.LEARNING_PREFETCH_CONCURRENCY)
+
+        async def fetch(key: tuple):
+            inflight = _inflight.get(key)
+            if inflight is not None:
+                # A user request is already fetching this key; it stores it too
+                await asyncio.shield(inflight)
+                return key, None
+            async with semaphore:
+                videos = await _fetch_youtube_videos(_build_search_query(*key), max_results=5, prefetch=True)
+                return key, videos
+
+        results = await asyncio.gather(*[fetch(k) for k in missing], return_exceptions=True)
+
+        entries = {}
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Prefetch fetch failed: {result}")
+                continue
+            key, videos = result
+            if videos:
+                entries[key] = videos
+
+        _store_cache_bulk(entries, db)
+        logger.info(f"Prefetched learning resources for {len(entries)}/{len(missing)} skills")
+        return len(entries)
+    finally:
+        db.close()
+
+
+def schedule_roadmap_prefetch(roadmap_data: dict):
+    """
+    Pipeline stage run after a roadmap is persisted: prefetch resources
+    for the first level's skills in the background so the pages a new
+    user opens first are warm cache hits. Later levels are fetched on
+    demand once unlocked; prefetch spending is capped by the quota ledger.
+    """
+    levels = roadmap_data.get("levels", [])[:settings.LEARNING_PREFETCH_LEVELS]
+    skills = [
+        (skill.get("name"), level.get("name"))
+        for level in levels
+        for skill in level.get("skills", [])
+    ]
+    task = asyncio.ensure_future(prefetch_learning_resources(skills))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    task.add_done_callback(_log_background_error)
+
+
 def clear_skill_cache(skill_name: str, db: Session):
     """Clear cached resources for a skill (for manual refresh)."""
+    skill_name = canonicalize(skill_name)
+    _memory_cache.evict_skill(skill_name)
     db.query(LearningCache).filter(
         LearningCache.skill_name == skill_name
     ).delete()
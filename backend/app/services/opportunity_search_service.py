@@ -0,0 +1,310 @@
+"""
+Opportunity Search Service — in-process BM25 index over Opportunity
+title, description and skill tags.
+
+- Skill aliases ("ML", "k8s", "ReactJS") from the skill registry are
+  folded onto canonical terms so queries and documents meet on the same
+  vocabulary.
+- The index is built lazily from the DB on first use and then updated
+  incrementally whenever this process inserts opportunities. Rows written
+  or expired by other workers (and the scheduler) are pulled in by an
+  updated_at delta every OPPORTUNITY_INDEX_REFRESH_SECONDS; rows deleted
+  elsewhere are dropped when a search no longer finds them live.
+- Filtering (type, level, expiry) happens in memory, so a query never
+  touches the database until the final id lookup.
+"""
+import math
+import re
+import threading
+import time
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.career import Opportunity
+from app.services.skill_registry_service import SKILL_ALIASES
+
+logger = logging.getLogger(__name__)
+
+# ─── BM25 parameters ──────────────────────────────────────
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Delta refreshes re-read this far behind the last sync, so rows from
+# transactions that committed after it started are not missed
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+# Field weights (BM25F-style: term frequencies are scaled per field)
+FIELD_WEIGHTS = {
+    "skill_tags": 3,
+    "title": 2,
+    "description": 1,
+}
+
+# ─── Skill synonyms ───────────────────────────────────────
+# Aliases come from the shared skill registry. Canonical phrases are
+# indexed as a single joined token (e.g. "machine_learning") alongside
+# their words.
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./]*")
+_STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "to", "in", "on", "with", "at",
+    "by", "or", "is", "are", "be", "as", "from", "your", "you", "this",
+}
+
+
+def _raw_tokens(text: str) -> List[str]:
+    return [t.rstrip(".") for t in _TOKEN_RE.findall((text or "").lower()) if t.rstrip(".")]
+
+
+def _build_phrase_table() -> Dict[Tuple[str, ...], str]:
+    table = {}
+    for canonical, aliases in SKILL_ALIASES.items():
+        joined = "_".join(_raw_tokens(canonical))
+        for variant in [canonical, *aliases]:
+            tokens = tuple(_raw_tokens(variant))
+            if tokens:
+                table[tokens] = joined
+    return table
+
+
+_PHRASES = _build_phrase_table()
+_MAX_PHRASE = max(len(k) for k in _PHRASES)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase, split, and fold known skill aliases onto canonical tokens.
+    Multi-word canonical skills emit both the joined token and their words.
+    """
+    words = _raw_tokens(text)
+    out: List[str] = []
+    i = 0
+    while i < len(words):
+        matched = False
+        for n in range(min(_MAX_PHRASE, len(words) - i), 0, -1):
+            canonical = _PHRASES.get(tuple(words[i:i + n]))
+            if canonical:
+                out.append(canonical)
+                if "_" in canonical:
+                    out.extend(w for w in canonical.split("_") if w not in _STOPWORDS)
+                i += n
+                matched = True
+                break
+        if not matched:
+            if words[i] not in _STOPWORDS:
+                out.append(words[i])
+            i += 1
+    return out
+
+
+class _Doc:
+    __slots__ = ("tf", "length", "opportunity_type", "level", "deadline", "created_at")
+
+    def __init__(self, tf, length, opportunity_type, level, deadline, created_at):
+        self.tf = tf
+        self.length = length
+        self.opportunity_type = opportunity_type
+        self.level = level
+        self.deadline = deadline
+        self.created_at = created_at
+
+
+class OpportunitySearchIndex:
+    """Thread-safe, incrementally updatable BM25 index."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs: Dict[str, _Doc] = {}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._total_length = 0.0
+        self._loaded = False
+        self._synced_at = 0.0            # monotonic time of the last DB sync
+        self._watermark: Optional[datetime] = None  # DB time of the last sync
+        self._sync_lock = threading.Lock()
+
+    # ── Maintenance ───────────────────────────────────────
+    def ensure_loaded(self, db: Session, *filters):
+        """
+        Build the index from live opportunities on first use, then apply
+        rows changed by other processes once the refresh interval passes.
+        """
+        if self._loaded and not self._stale():
+            return
+        # First build waits; later refreshes are skipped while one is running
+        if not self._sync_lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            if not self._loaded:
+                self._build(db, filters)
+            elif self._stale():
+                try:
+                    self._refresh(db)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Opportunity search index refresh failed: {e}")
+                self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def _stale(self) -> bool:
+        return time.monotonic() - self._synced_at >= settings.OPPORTUNITY_INDEX_REFRESH_SECONDS
+
+    def _build(self, db: Session, filters) -> None:
+        watermark = db.query(func.now()).scalar()
+        rows = db.query(Opportunity).filter(
+            *(filters or (Opportunity.is_expired == False,))
+        ).all()
+        with self._lock:
+            for opp in rows:
+                self._add(opp)
+            self._loaded = True
+        self._watermark = watermark
+        self._synced_at = time.monotonic()
+        logger.info(f"Opportunity search index built with {len(rows)} documents")
+
+    def _refresh(self, db: Session) -> None:
+        """Apply rows inserted, re-upserted or expired since the last sync."""
+        watermark = db.query(func.now()).scalar()
+        # Served by idx_opportunities_updated_at
+        rows = db.query(Opportunity).filter(
+            Opportunity.updated_at >= self._watermark - REFRESH_OVERLAP
+        ).all()
+        with self._lock:
+            for opp in rows:
+                if opp.is_expired:
+                    self._remove(str(opp.id))
+                else:
+                    self._add(opp)
+        self._watermark = watermark
+        if rows:
+            logger.info(f"Opportunity search index refreshed {len(rows)} documents")
+
+    def add(self, opportunities: Iterable) -> None:
+        """Insert or replace documents. Accepts ORM objects or dicts."""
+        with self._lock:
+            for opp in opportunities:
+                self._add(opp)
+
+    def remove(self, ids: Iterable) -> None:
+        with self._lock:
+            for doc_id in ids:
+                self._remove(str(doc_id))
+
+    def _add(self, opp) -> None:
+        get = opp.get if isinstance(opp, dict) else lambda k, d=None: getattr(opp, k, d)
+        doc_id = str(get("id"))
+        self._remove(doc_id)
+
+        tf: Dict[str, float] = defaultdict(float)
+        for tag in get("skill_tags") or []:
+            for term in tokenize(str(tag)):
+                tf[term] += FIELD_WEIGHTS["skill_tags"]
+        for term in tokenize(get("title") or ""):
+            tf[term] += FIELD_WEIGHTS["title"]
+        for term in tokenize(get("description") or ""):
+            tf[term] += FIELD_WEIGHTS["description"]
+
+        length = sum(tf.values())
+        self._docs[doc_id] = _Doc(
+            tf=dict(tf),
+            length=length,
+            opportunity_type=get("opportunity_type"),
+            level=get("level"),
+            deadline=get("deadline"),
+            created_at=get("created_at"),
+        )
+        for term, freq in tf.items():
+            self._postings[term][doc_id] = freq
+        self._total_length += length
+
+    def _remove(self, doc_id: str) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if not doc:
+            return
+        for term in doc.tf:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= doc.length
+
+    # ── Query ─────────────────────────────────────────────
+    def search(
+        self,
+        query: List[str],
+        level: Optional[str] = None,
+        opportunity_type: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Tuple[str, float, int]]:
+        """
+        Rank live documents against the query skills.
+        Returns (doc_id, bm25_score, match_pct) sorted best first;
+        match_pct is the share of query skills present in the document.
+        """
+        now = datetime.now(timezone.utc)
+
+        def allowed(doc: _Doc) -> bool:
+            if opportunity_type and doc.opportunity_type != opportunity_type:
+                return False
+            if level and doc.level != level:
+                return False
+            if doc.deadline is not None and _aware(doc.deadline) < now:
+                return False
+            return True
+
+        skill_terms = [set(tokenize(q)) for q in query if q and q.strip()]
+        skill_terms = [t for t in skill_terms if t]
+        terms = set().union(*skill_terms) if skill_terms else set()
+        # A skill "matches" a document when its canonical token(s) are present
+        skill_keys = [{t for t in st if "_" in t} or st for st in skill_terms]
+
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return []
+
+            if not terms:
+                recent = [(d_id, doc) for d_id, doc in self._docs.items() if allowed(doc)]
+                recent.sort(key=lambda x: _sort_ts(x[1].created_at), reverse=True)
+                return [(d_id, 0.0, 0) for d_id, _ in recent[:limit]]
+
+            avg_len = self._total_length / n_docs if n_docs else 1.0
+            scores: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, freq in postings.items():
+                    doc = self._docs[doc_id]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc.length / (avg_len or 1.0))
+                    scores[doc_id] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+            ranked = []
+            for doc_id, score in scores.items():
+                doc = self._docs[doc_id]
+                if not allowed(doc):
+                    continue
+                hits = sum(1 for key in skill_keys if key <= doc.tf.keys())
+                match_pct = round(100 * hits / len(skill_keys))
+                ranked.append((doc_id, score, match_pct))
+
+        ranked.sort(key=lambda x: (x[1], _sort_ts(self._docs[x[0]].created_at)), reverse=True)
+        return ranked[:limit]
+
+
+def _aware(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def _sort_ts(dt: Optional[datetime]) -> float:
+    return _aware(dt).timestamp() if dt else 0.0
+
+
+# Singleton instance
+opportunity_index = OpportunitySearchIndex()
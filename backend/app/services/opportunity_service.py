@@ -7,12 +7,110 @@ import json
 import logging
 from typing import List, Optional
 from datetime import datetime, timezone
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.services.ai_service import ai_hub
 from app.models.career import Opportunity
+from app.services.opportunity_search_service import opportunity_index
+from app.services.skill_registry_service import canonicalize_list
 
 logger = logging.getLogger(__name__)
 
+EXPIRY_BATCH_SIZE = 500
+
+OPPORTUNITY_FIELDS = [
+    "title", "company", "opportunity_type",
+    "description", "url", "source", "skill_tags",
+    "level", "location", "salary_range"
+]
+
+
+def live_opportunity_filters(now: Optional[datetime] = None) -> list:
+    """
+    Filters for opportunities that are live right now. Deadline expiry is
+    evaluated at read time, so rows past their deadline are hidden even
+    before the daily job flips is_expired.
+    """
+    now = now or datetime.now(timezone.utc)
+    return [
+        Opportunity.is_expired == False,
+        or_(Opportunity.deadline == None, Opportunity.deadline > now)
+    ]
+
+
+def make_dedupe_key(title: str, source: Optional[str]) -> str:
+    """
+    Normalized (title, source) key used by the unique constraint.
+    Case and whitespace differences do not create new rows.
+    """
+    norm_title = " ".join((title or "").lower().split())
+    norm_source = " ".join((source or "").lower().split())
+    return f"{norm_title}|{norm_source}"
+
+
+def _bulk_upsert_opportunities(opportunities: List[dict], db: Session) -> List[dict]:
+    """
+    Persist a discovery batch with a single multi-row
+    INSERT ... ON CONFLICT (dedupe_key) DO UPDATE ... RETURNING.
+    Existing rows are only touched (updated_at) so they are returned too.
+    """
+    rows = {}
+    for opp in opportunities:
+        if not isinstance(opp, dict):
+            continue
+        if not all(k in opp for k in ["title", "url", "opportunity_type"]):
+            continue
+
+        key = make_dedupe_key(opp["title"], opp.get("source", ""))
+        if key in rows:
+            # Postgres rejects a batch that hits the same conflict key twice
+            continue
+
+        rows[key] = {
+            "title": opp["title"],
+            "company": opp.get("company"),
+            "opportunity_type": opp["opportunity_type"],
+            "description": opp.get("description"),
+            "url": opp["url"],
+            "source": opp.get("source"),
+            "skill_tags": canonicalize_list(opp.get("skill_tags") or []),
+            "level": opp.get("level"),
+            "location": opp.get("location"),
+            "salary_range": opp.get("salary_range"),
+            "dedupe_key": key,
+        }
+
+    if not rows:
+        return []
+
+    stmt = pg_insert(Opportunity).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Opportunity.dedupe_key],
+        set_={"updated_at": func.now()}
+    ).returning(
+        Opportunity.id,
+        Opportunity.deadline,
+        Opportunity.created_at,
+        *[getattr(Opportunity, k) for k in OPPORTUNITY_FIELDS]
+    )
+
+    try:
+        result = db.execute(stmt).mappings().all()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to save opportunities: {e}")
+        return []
+
+    # Keep the in-process search index in step with the table
+    opportunity_index.add(dict(row) for row in result)
+
+    return [
+        {"id": str(row["id"]), **{k: row[k] for k in OPPORTUNITY_FIELDS}}
+        for row in result
+    ]
+
 
 async def generate_opportunities(
     target_role: str,
@@ -91,63 +189,8 @@ that may expire)
         if not isinstance(opportunities, list):
             return []
 
-        # Save to database (deduplicate by title + source)
-        saved = []
-        for opp in opportunities:
-            if not all(k in opp for k in ["title", "url", "opportunity_type"]):
-                continue
-
-            # Check for duplicate
-            existing = db.query(Opportunity).filter(
-                Opportunity.title == opp["title"],
-                Opportunity.source == opp.get("source", "")
-            ).first()
-
-            if existing:
-                saved.append({
-                    "id": str(existing.id),
-                    **{k: getattr(existing, k) for k in [
-                        "title", "company", "opportunity_type",
-                        "description", "url", "source", "skill_tags",
-                        "level", "location", "salary_range"
-                    ]}
-                })
-                continue
-
-            new_opp = Opportunity(
-                title=opp["title"],
-                company=opp.get("company"),
-                opportunity_type=opp["opportunity_type"],
-                description=opp.get("description"),
-                url=opp["url"],
-                source=opp.get("source"),
-                skill_tags=opp.get("skill_tags", []),
-                level=opp.get("level"),
-                location=opp.get("location"),
-                salary_range=opp.get("salary_range")
-            )
-            db.add(new_opp)
-            try:
-                db.commit()
-                db.refresh(new_opp)
-                saved.append({
-                    "id": str(new_opp.id),
-                    "title": new_opp.title,
-                    "company": new_opp.company,
-                    "opportunity_type": new_opp.opportunity_type,
-                    "description": new_opp.description,
-                    "url": new_opp.url,
-                    "source": new_opp.source,
-                    "skill_tags": new_opp.skill_tags,
-                    "level": new_opp.level,
-                    "location": new_opp.location,
-                    "salary_range": new_opp.salary_range
-                })
-            except Exception as e:
-                db.rollback()
-                logger.error(f"Failed to save opportunity: {e}")
-
-        return saved
+        # Save to database in one round-trip (deduplicate by title + source)
+        return _bulk_upsert_opportunities(opportunities, db)
 
     except json.JSONDecodeError:
         logger.error("Failed to parse opportunities JSON")
@@ -165,54 +208,74 @@ def get_matched_opportunities(
     limit: int = 20
 ) -> List[dict]:
     """
-    Get opportunities matched to user skills from the database.
-    Filters out expired ones.
+    Get opportunities ranked by BM25 relevance to the user's skills
+    (title, description and skill tags, with skill synonyms).
+    Filters out expired ones. When no opportunity matches, the most
+    recent live ones are returned instead (with match_score 0).
     """
-    query = db.query(Opportunity).filter(Opportunity.is_expired == False)
-
-    if opportunity_type:
-        query = query.filter(Opportunity.opportunity_type == opportunity_type)
-    if level:
-        query = query.filter(Opportunity.level == level)
+    opportunity_index.ensure_loaded(db, *live_opportunity_filters())
+    ranked = opportunity_index.search(
+        query=user_skills,
+        level=level,
+        opportunity_type=opportunity_type,
+        limit=limit
+    )
+    if not ranked and user_skills:
+        ranked = opportunity_index.search(
+            query=[], level=level, opportunity_type=opportunity_type, limit=limit
+        )
+    if not ranked:
+        return []
 
-    all_opps = query.order_by(Opportunity.created_at.desc()).limit(limit * 3).all()
+    ids = [doc_id for doc_id, _, _ in ranked]
+    rows = db.query(Opportunity).filter(
+        Opportunity.id.in_(ids),
+        *live_opportunity_filters()
+    ).all()
+    by_id = {str(opp.id): opp for opp in rows}
 
-    # Score by skill match
-    scored = []
-    user_skills_lower = {s.lower() for s in user_skills}
-    for opp in all_opps:
-        tags = [t.lower() for t in (opp.skill_tags or [])]
-        match_count = len(user_skills_lower.intersection(tags))
-        scored.append((match_count, opp))
+    results = []
+    for doc_id, relevance, match_pct in ranked:
+        opp = by_id.get(doc_id)
+        if not opp:
+            # Deleted or expired since indexing
+            opportunity_index.remove([doc_id])
+            continue
+        results.append({
+            **_serialize_opportunity(opp),
+            "match_score": match_pct,
+            "relevance": round(relevance, 3)
+        })
+    return results
 
-    scored.sort(key=lambda x: x[0], reverse=True)
 
-    return [
-        {
-            "id": str(opp.id),
-            "title": opp.title,
-            "company": opp.company,
-            "opportunity_type": opp.opportunity_type,
-            "description": opp.description,
-            "url": opp.url,
-            "source": opp.source,
-            "skill_tags": opp.skill_tags,
-            "level": opp.level,
-            "location": opp.location,
-            "salary_range": opp.salary_range,
-            "match_score": score
-        }
-        for score, opp in scored[:limit]
-    ]
+def _serialize_opportunity(opp: Opportunity) -> dict:
+    return {"id": str(opp.id), **{k: getattr(opp, k) for k in OPPORTUNITY_FIELDS}}
 
 
-def cleanup_expired_opportunities(db: Session) -> int:
-    """Mark opportunities with past deadlines as expired."""
+def cleanup_expired_opportunities(db: Session, batch_size: int = EXPIRY_BATCH_SIZE) -> int:
+    """
+    Mark opportunities with past deadlines as expired, in small batches.
+    Reads already hide these rows (see live_opportunity_filters); this only
+    keeps the partial indexes lean. Each batch is its own short transaction
+    and skips rows locked by concurrent writers. updated_at is bumped so
+    every worker's search index drops the rows on its next refresh.
+    """
     now = datetime.now(timezone.utc)
-    count = db.query(Opportunity).filter(
-        Opportunity.deadline != None,
-        Opportunity.deadline < now,
-        Opportunity.is_expired == False
-    ).update({"is_expired": True})
-    db.commit()
-    return count
+    total = 0
+    while True:
+        batch_ids = db.query(Opportunity.id).filter(
+            Opportunity.is_expired == False,
+            Opportunity.deadline != None,
+            Opportunity.deadline < now
+        ).limit(batch_size).with_for_update(skip_locked=True).subquery()
+
+        count = db.query(Opportunity).filter(
+            Opportunity.id.in_(db.query(batch_ids.c.id))
+        ).update({"is_expired": True, "updated_at": func.now()}, synchronize_session=False)
+        db.commit()
+
+        total += count
+        if count < batch_size:
+            break
+    return total
@@ -0,0 +1,59 @@
+"""
+PDF text extraction that runs inside worker processes.
+
+Kept free of app imports (only pypdf) so worker processes start quickly
+and a crashing or runaway parse never touches the event loop process.
+Limits are enforced inside the worker:
+- memory: RLIMIT_AS set once per worker (Unix only)
+- time:   SIGALRM per document (Unix only)
+- pages:  rejected before any text is extracted
+"""
+import io
+import signal
+from pypdf import PdfReader
+
+
+class PdfLimitExceeded(ValueError):
+    """The document is over one of the extraction limits."""
+
+
+def init_worker(max_memory_mb: int):
+    """ProcessPoolExecutor initializer: cap the worker's address space."""
+    try:
+        import resource
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        # Not supported on this platform; rely on the time/page limits
+        pass
+
+
+def _on_timeout(signum, frame):
+    raise PdfLimitExceeded("PDF parsing took too long")
+
+
+def extract_text(source, max_pages: int, timeout_seconds: int) -> str:
+    """
+    Extract text from a PDF within the given page and time limits.
+    `source` is the raw bytes or a path to a spooled temporary file.
+    """
+    has_alarm = hasattr(signal, "SIGALRM")
+    if has_alarm:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.alarm(timeout_seconds)
+    try:
+        reader = PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+        if len(reader.pages) > max_pages:
+            raise PdfLimitExceeded(f"PDF has more than {max_pages} pages")
+
+        text = ""
+        for page in reader.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+        return text
+    except MemoryError:
+        raise PdfLimitExceeded("PDF needs too much memory to parse")
+    finally:
+        if has_alarm:
+            signal.alarm(0)
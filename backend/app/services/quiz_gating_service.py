@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 from app.services.ai_service import ai_hub
 from app.models.career import QuizAttempt, Roadmap
 from app.services.roadmap_service import PASS_THRESHOLDS, update_skill_status
+from app.services.skill_registry_service import canonicalize
 
 logger = logging.getLogger(__name__)
 
@@ -115,7 +116,7 @@ def submit_quiz_attempt(
         user_id=user_id,
         roadmap_id=roadmap_id,
         skill_id=skill_id,
-        skill_name=skill_name,
+        skill_name=canonicalize(skill_name),
         level=level,
         score=score,
         passed=passed,
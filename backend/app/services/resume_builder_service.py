@@ -1,7 +1,16 @@
+import asyncio
+import hashlib
 import json
 import re
 import logging
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.resume import OptimizedSectionCache
+from app.services import ats_scoring_service
 from app.services.ai_service import ai_hub
 
 logger = logging.getLogger(__name__)
@@ -190,30 +199,103 @@ async def enhance_skills(data: dict, target_role: str = "") -> dict:
     return _parse_ai_json(response)
 
 
-async def run_ats_check(resume_data: dict, target_role: str = "") -> dict:
-    resume_text = json.dumps(resume_data)
+SECTION_ENHANCERS = {
+    "personal_info": enhance_personal_info,
+    "education": enhance_education,
+    "experience": enhance_experience,
+    "projects": enhance_projects,
+    "skills": enhance_skills,
+}
+
+
+async def enhance_sections(
+    sections: dict, target_role: str = "", section_roles: Optional[dict] = None
+) -> AsyncIterator[dict]:
+    """
+    Run the section enhancers concurrently (each LLM call still goes
+    through ai_hub's global limiter) and yield
+    {"section", "result"} / {"section", "error"} in completion order.
+    A role in `section_roles` overrides `target_role` for that section.
+    """
+    section_roles = section_roles or {}
+
+    async def run(name: str, data: dict) -> dict:
+        role = section_roles.get(name) or target_role
+        try:
+            return {"section": name, "result": await SECTION_ENHANCERS[name](data, role)}
+        except Exception as e:
+            logger.error(f"Enhancing section {name} failed: {e}")
+            return {"section": name, "error": str(e)}
+
+    tasks = [
+        asyncio.create_task(run(name, data))
+        for name, data in sections.items()
+        if name in SECTION_ENHANCERS and data is not None
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away mid-stream: stop the remaining LLM calls
+        for task in tasks:
+            task.cancel()
+
+
+async def run_ats_check(resume_data: dict, target_role: str = "", with_feedback: Optional[bool] = None) -> dict:
+    """
+    ATS score from the local scoring engine; the LLM only rewrites the
+    strengths/improvements narrative (skipped when with_feedback is False
+    or the LLM call fails).
+    """
+    if with_feedback is None:
+        with_feedback = settings.ATS_LLM_FEEDBACK
+
+    resume_text = ats_scoring_service.resume_data_to_text(resume_data)
+    scored = ats_scoring_service.score_resume(resume_text, target_role=target_role)
+    result = {
+        "section": "ats_check",
+        "score": scored["ats_score"],
+        "strengths": scored["strengths"],
+        "improvements": scored["improvements"],
+        "keyword_analysis": scored["keyword_analysis"],
+        "score_breakdown": scored["breakdown"],
+        "feedback_available": False,
+    }
+    if not with_feedback:
+        return result
+
     prompt = f"""
-    Evaluate the following resume data for ATS (Applicant Tracking System) compatibility.
+    Review the following resume for ATS (Applicant Tracking System) compatibility.
     Target Role: {target_role or 'General'}
     
-    Resume Data: {resume_text[:4000]}
+    Computed ATS score: {scored['ats_score']}/100
+    Matched keywords: {', '.join(scored['keyword_analysis']['matched']) or 'none'}
+    Missing keywords: {', '.join(scored['keyword_analysis']['missing']) or 'none'}
+    
+    Resume:
+    {resume_text[:4000]}
     
     Task:
-    - Score ATS compatibility from 0-100.
-    - Check keyword alignment with the target role.
     - Identify strengths and areas for improvement.
     - Suggest concrete improvements without altering facts.
     
     Return ONLY this JSON:
     {{
-        "section": "ats_check",
-        "score": 0,
         "strengths": ["strength 1", "strength 2"],
         "improvements": ["improvement 1", "improvement 2"]
     }}
     """
     response = await ai_hub.chat_completion([{"role": "user", "content": prompt}], SYSTEM_PROMPT)
-    return _parse_ai_json(response)
+    feedback = _parse_ai_json(response)
+    if "error" in feedback or "SYSTEM ERROR" in (feedback.get("keyword_analysis") or {}).get("matched", []):
+        return result
+
+    if feedback.get("strengths"):
+        result["strengths"] = feedback["strengths"]
+    if feedback.get("improvements"):
+        result["improvements"] = feedback["improvements"]
+    result["feedback_available"] = True
+    return result
 
 
 async def regenerate_section(section_data: dict, mode: str, target_role: str = "") -> dict:
@@ -242,8 +324,15 @@ async def regenerate_section(section_data: dict, mode: str, target_role: str = "
     return _parse_ai_json(response)
 
 
-async def optimize_full_resume(resume_data: dict, target_role: str = "", template_style: str = "modern") -> dict:
-    """Optimize the entire resume content for a specific template style."""
+async def optimize_full_resume(
+    resume_data: dict, target_role: str = "", template_style: str = "modern", db: Optional[Session] = None,
+    on_llm_calls: Optional[Callable[[int], None]] = None,
+) -> dict:
+    """
+    Optimize the resume content for a specific template style.
+    With a db session, unchanged entries are served from the optimized-section cache.
+    `on_llm_calls(n)` is told how many LLM calls are about to be made (and may raise to refuse them).
+    """
     
     style_instructions = {
         "modern": "Write in a clean, professional, and concise style. Use modern action verbs. Keep bullets tight and impactful. Focus on measurable outcomes.",
@@ -258,54 +347,220 @@ async def optimize_full_resume(resume_data: dict, target_role: str = "", templat
     }
     
     instruction = style_instructions.get(template_style, style_instructions["modern"])
-    resume_text = json.dumps(resume_data, indent=2)
-    
-    prompt = f"""
-    Optimize the following complete resume data for maximum professional impact.
-    Target Role: {target_role or 'General'}
-    Writing Style: {instruction}
-    
-    Resume Data:
-    {resume_text[:6000]}
-    
-    CRITICAL RULES:
-    - Do NOT invent any fake experience, skills, or achievements.
-    - Do NOT add information that doesn't exist in the input.
-    - Improve and rewrite professional_summary to be powerful and role-specific.
-    - Rewrite experience descriptions/bullets with strong action verbs and clear impact.
-    - Improve project descriptions to highlight problem-solving and technologies.
-    - Keep all dates, company names, institutions, and factual details UNCHANGED.
-    - Optimize for ATS keyword alignment with the target role.
-    
-    Return the optimized resume in this EXACT JSON format:
-    {{
-        "personal": {{
+
+    # Each entry is optimized independently (personal info, every experience
+    # and project entry) and cached by its content hash, so only entries that
+    # changed since the last run are sent to the LLM, batched concurrently.
+    context = _resume_context(resume_data)
+    units = _optimization_units(resume_data, context)
+    if not units:
+        return {"error": "Resume has no content to optimize"}
+
+    cached = get_cached_sections([u[3] for u in units], target_role, template_style, db) if db else {}
+    pending = [u for u in units if u[3] not in cached]
+
+    parts = []
+    if any(u[0] == "personal" for u in pending):
+        parts.append(("personal", [u for u in pending if u[0] == "personal"]))
+    for key in ("experience", "projects"):
+        key_units = [u for u in pending if u[0] == key]
+        for batch in _batch_items([u[2] for u in key_units], OPTIMIZE_CHUNK_CHARS):
+            parts.append((key, key_units[:len(batch)]))
+            key_units = key_units[len(batch):]
+
+    if on_llm_calls and parts:
+        on_llm_calls(len(parts))
+
+    results = await asyncio.gather(
+        *(
+            _optimize_part(key, part_units[0][2] if key == "personal" else [u[2] for u in part_units],
+                           context, target_role, instruction)
+            for key, part_units in parts
+        ),
+        return_exceptions=True,
+    )
+
+    fresh: Dict[str, dict] = {}
+    errors = []
+    for (key, part_units), result in zip(parts, results):
+        if isinstance(result, Exception) or "error" in result or key not in result:
+            errors.append(result if isinstance(result, dict) else {"error": str(result)})
+            continue  # keep these entries unchanged (and uncached)
+        improved = [result[key]] if key == "personal" else result[key]
+        # Entries are matched by position, so a batch that came back reshaped is kept as-is
+        if not isinstance(improved, list) or len(improved) != len(part_units):
+            errors.append({"error": f"Unexpected {key} shape from optimizer"})
+            continue
+        for unit, item in zip(part_units, improved):
+            if isinstance(item, dict):
+                fresh[unit[3]] = item
+
+    if parts and len(errors) == len(parts) and not cached:
+        return errors[0]
+    if db and fresh:
+        store_cached_sections(fresh, target_role, template_style, db)
+
+    optimized: dict = {}
+    for key, _, original, content_hash in units:
+        item = fresh.get(content_hash) or cached.get(content_hash) or original
+        if key == "personal":
+            optimized["personal"] = item
+        else:
+            optimized.setdefault(key, []).append(item)
+    optimized["optimization"] = {
+        "sections": len(units),
+        "from_cache": len(units) - len(pending),
+        "optimized": len(fresh),
+    }
+    return optimized
+
+
+# ─── Section hashes & optimized-section cache ─────────────
+# Bump when the optimization prompt changes so cached rewrites are not reused
+OPTIMIZE_VERSION = "1"
+
+
+def _content_hash(kind: str, value) -> str:
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{OPTIMIZE_VERSION}|{kind}|{payload}".encode("utf-8")).hexdigest()
+
+
+def _optimization_units(resume_data: dict, context: str) -> List[tuple]:
+    """(section, index, original, content_hash) for every entry the optimizer rewrites."""
+    units = []
+    personal = resume_data.get("personal")
+    if personal:
+        # The summary is written against the rest of the resume, so its key includes that context
+        units.append(("personal", 0, personal, _content_hash("personal", [personal, context])))
+    for key in ("experience", "projects"):
+        for i, item in enumerate(resume_data.get(key) or []):
+            units.append((key, i, item, _content_hash(key, item)))
+    return units
+
+
+def _normalize_role(target_role: str) -> str:
+    return " ".join((target_role or "").split()).casefold()
+
+
+def get_cached_sections(hashes: List[str], target_role: str, template_style: str, db: Session) -> Dict[str, dict]:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.RESUME_CACHE_TTL_DAYS)
+    try:
+        rows = db.query(OptimizedSectionCache.section_hash, OptimizedSectionCache.optimized).filter(
+            OptimizedSectionCache.section_hash.in_(set(hashes)),
+            OptimizedSectionCache.target_role == _normalize_role(target_role),
+            OptimizedSectionCache.template_style == template_style,
+            OptimizedSectionCache.created_at > cutoff,
+        ).all()
+    except Exception as e:
+        logger.error(f"Optimized section cache lookup failed: {e}")
+        db.rollback()
+        return {}
+    return {row.section_hash: row.optimized for row in rows}
+
+
+def store_cached_sections(sections: Dict[str, dict], target_role: str, template_style: str, db: Session):
+    role = _normalize_role(target_role)
+    try:
+        stmt = pg_insert(OptimizedSectionCache).values([
+            {"section_hash": h, "target_role": role, "template_style": template_style, "optimized": item}
+            for h, item in sections.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_optimized_section_key",
+            set_={"optimized": stmt.excluded.optimized, "created_at": func.now()}
+        )
+        db.execute(stmt)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failed to cache optimized sections: {e}")
+        db.rollback()
+
+
+# ─── Chunked full-resume optimization ─────────────────────
+OPTIMIZE_CHUNK_CHARS = 3000
+
+OPTIMIZE_PART_FORMATS = {
+    "personal": """{
+        "personal": {
             "full_name": "unchanged",
             "email": "unchanged",
             "phone": "unchanged",
             "location": "unchanged",
             "professional_summary": "improved summary"
-        }},
+        }
+    }""",
+    "experience": """{
         "experience": [
-            {{
+            {
                 "title": "unchanged",
                 "organization": "unchanged",
                 "duration": "unchanged",
                 "description": "improved description",
                 "bullets": ["improved bullet 1", "improved bullet 2", "improved bullet 3"]
-            }}
-        ],
+            }
+        ]
+    }""",
+    "projects": """{
         "projects": [
-            {{
+            {
                 "name": "unchanged",
                 "technologies": "unchanged",
                 "description": "improved description"
-            }}
+            }
         ]
-    }}
+    }""",
+}
+
+
+def _batch_items(items: list, max_chars: int) -> List[list]:
+    """Group list entries into batches whose JSON stays under max_chars (one entry minimum)."""
+    batches: List[list] = []
+    size = 0
+    for item in items:
+        item_size = len(json.dumps(item))
+        if batches and size + item_size <= max_chars:
+            batches[-1].append(item)
+            size += item_size
+        else:
+            batches.append([item])
+            size = item_size
+    return batches
+
+
+def _resume_context(resume_data: dict) -> str:
+    """Short cross-section context (headline roles and skills) shared by every part."""
+    roles = [e.get("title") for e in resume_data.get("experience") or [] if isinstance(e, dict) and e.get("title")]
+    skills = resume_data.get("skills") or {}
+    skill_list = [*(skills.get("technical_skills") or []), *(skills.get("tools") or [])] if isinstance(skills, dict) else []
+    return f"Roles held: {', '.join(roles) or 'none'}\nSkills: {', '.join(map(str, skill_list)) or 'none'}"
+
+
+async def _optimize_part(key: str, payload, context: str, target_role: str, instruction: str) -> dict:
+    prompt = f"""
+    Optimize the following resume section for maximum professional impact.
+    Target Role: {target_role or 'General'}
+    Writing Style: {instruction}
+    
+    Candidate context (do not copy into the output):
+    {context}
+    
+    Section "{key}":
+    {json.dumps(payload, indent=2)}
+    
+    CRITICAL RULES:
+    - Do NOT invent any fake experience, skills, or achievements.
+    - Do NOT add information that doesn't exist in the input.
+    - Improve and rewrite professional_summary to be powerful and role-specific.
+    - Rewrite experience descriptions/bullets with strong action verbs and clear impact.
+    - Improve project descriptions to highlight problem-solving and technologies.
+    - Keep all dates, company names, institutions, and factual details UNCHANGED.
+    - Keep the same number of entries, in the same order.
+    - Optimize for ATS keyword alignment with the target role.
+    
+    Return the optimized section in this EXACT JSON format:
+    {OPTIMIZE_PART_FORMATS[key]}
     
     Return ONLY valid JSON. No markdown, no explanations.
     """
     response = await ai_hub.chat_completion([{"role": "user", "content": prompt}], SYSTEM_PROMPT)
     return _parse_ai_json(response)
-
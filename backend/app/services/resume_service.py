@@ -1,116 +1,610 @@
+import asyncio
+import hashlib
 import io
 import json
-from pypdf import PdfReader
+import logging
+import os
+import re
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.resume import ResumeTextCache, ResumeAnalysisCache
+from app.services import ats_scoring_service, pdf_worker
 from app.services.ai_service import ai_hub
 
-async def extract_text_from_pdf(file_content: bytes) -> str:
-    reader = PdfReader(io.BytesIO(file_content))
-    text = ""
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            text += page_text + "\n"
-    return text
+logger = logging.getLogger(__name__)
 
-async def analyze_resume_with_ai(resume_text: str, job_description: str = ""):
-    system_prompt = "You are a world-class AI Career Consultant and Resume Strategist."
-    
+
+class PdfExtractionBusy(Exception):
+    """All PDF workers and queue slots are taken; the caller should retry."""
+
+
+class UploadTooLarge(ValueError):
+    """The upload is over RESUME_MAX_UPLOAD_MB."""
+
+
+class InvalidPdfUpload(ValueError):
+    """The upload does not start with a PDF header."""
+
+
+# ─── Streaming upload ingestion ───────────────────────────
+UPLOAD_CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_WINDOW = 1024  # The PDF spec allows the header within the first 1 KB
+
+
+class SpooledPdf:
+    """
+    An ingested upload: small files stay in memory, larger ones are
+    spooled to a named temporary file that the PDF worker reads by path.
+    """
+
+    def __init__(self, spool_threshold: int):
+        self.spool_threshold = spool_threshold
+        self.size = 0
+        self.path: Optional[str] = None
+        self._buffer = io.BytesIO()
+        self._file = None
+        self._hasher = hashlib.sha256()
+
+    def write(self, chunk: bytes):
+        self._hasher.update(chunk)
+        self.size += len(chunk)
+        if self._file is None and self.size > self.spool_threshold:
+            self._file = tempfile.NamedTemporaryFile(prefix="resume-", suffix=".pdf", delete=False)
+            self.path = self._file.name
+            self._file.write(self._buffer.getvalue())
+            self._buffer = None
+        elif self._file is None:
+            self._buffer.write(chunk)
+            return
+        self._file.write(chunk)
+
+    def finish(self):
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """What extract_text_from_pdf accepts: bytes in memory or a file path."""
+        return self.path if self.path else self._buffer.getvalue()
+
+    def cleanup(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+async def ingest_pdf_upload(file) -> SpooledPdf:
+    """
+    Read an UploadFile in chunks: check the PDF magic bytes, hash while
+    reading, enforce RESUME_MAX_UPLOAD_MB, and spool past
+    RESUME_SPOOL_THRESHOLD_KB to disk so memory per request stays bounded.
+
+    Starlette has already received (and spooled) the whole multipart body
+    by the time the handler runs, so the size check here is a backstop:
+    oversized requests are rejected before parsing by
+    RequestSizeLimitMiddleware (app/core/upload_limit.py).
+    """
+    max_bytes = settings.RESUME_MAX_UPLOAD_MB * 1024 * 1024
+    upload = SpooledPdf(spool_threshold=settings.RESUME_SPOOL_THRESHOLD_KB * 1024)
+    head = b""
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if len(head) < PDF_HEADER_WINDOW:
+                head += chunk[:PDF_HEADER_WINDOW - len(head)]
+                if len(head) >= PDF_HEADER_WINDOW and PDF_MAGIC not in head:
+                    raise InvalidPdfUpload("Invalid file content. Only PDF allowed.")
+            if upload.size + len(chunk) > max_bytes:
+                raise UploadTooLarge(f"File is too large. Maximum size is {settings.RESUME_MAX_UPLOAD_MB} MB.")
+            upload.write(chunk)
+
+        if upload.size and PDF_MAGIC not in head:
+            raise InvalidPdfUpload("Invalid file content. Only PDF allowed.")
+        upload.finish()
+        return upload
+    except Exception:
+        upload.cleanup()
+        raise
+
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_slots: Optional[asyncio.Semaphore] = None    # Running + queued documents
+_pdf_workers: Optional[asyncio.Semaphore] = None  # Running documents (one per pool process)
+# Jobs in flight per pool, and pools retired after a job overran; both are
+# only touched from the event loop
+_pdf_pool_jobs: Dict[ProcessPoolExecutor, int] = {}
+_retired_pdf_pools: Set[ProcessPoolExecutor] = set()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_MAX_WORKERS,
+            initializer=pdf_worker.init_worker,
+            initargs=(settings.PDF_MAX_MEMORY_MB,)
+        )
+    return _pdf_pool
+
+
+def _terminate_pdf_pool(pool: ProcessPoolExecutor):
+    for proc in list(getattr(pool, "_processes", {}).values()):
+        proc.terminate()
+    pool.shutdown(wait=False)
+
+
+def _reset_pdf_pool(pool: ProcessPoolExecutor):
+    """
+    Drop a broken pool; a fresh one is created on next use.
+    No-op if `pool` was already replaced, so a late caller never tears
+    down the fresh pool another request just started using.
+    """
+    global _pdf_pool
+    if pool is None or _pdf_pool is not pool:
+        return
+    _pdf_pool = None
+    _terminate_pdf_pool(pool)
+
+
+def _retire_pdf_pool(pool: ProcessPoolExecutor):
+    """
+    Take a pool with an overrunning job out of service. New jobs go to a
+    fresh pool; the old one's processes (the stuck one included) are
+    terminated only once the other documents it is parsing have finished.
+    """
+    global _pdf_pool
+    if _pdf_pool is pool:
+        _pdf_pool = None
+    _retired_pdf_pools.add(pool)
+
+
+def _release_pdf_pool(pool: ProcessPoolExecutor):
+    _pdf_pool_jobs[pool] -= 1
+    if _pdf_pool_jobs[pool] == 0:
+        del _pdf_pool_jobs[pool]
+        if pool in _retired_pdf_pools:
+            _retired_pdf_pools.discard(pool)
+            _terminate_pdf_pool(pool)
+
+
+def _get_pdf_slots() -> asyncio.Semaphore:
+    global _pdf_slots
+    if _pdf_slots is None:
+        _pdf_slots = asyncio.Semaphore(settings.PDF_MAX_WORKERS + settings.PDF_MAX_QUEUE)
+    return _pdf_slots
+
+
+def _get_pdf_workers() -> asyncio.Semaphore:
+    global _pdf_workers
+    if _pdf_workers is None:
+        _pdf_workers = asyncio.Semaphore(settings.PDF_MAX_WORKERS)
+    return _pdf_workers
+
+
+async def _acquire_pdf_worker(workers: asyncio.Semaphore) -> bool:
+    """Wait up to PDF_QUEUE_TIMEOUT_SECONDS for a free worker; False on timeout."""
+    acquire = asyncio.ensure_future(workers.acquire())
+    try:
+        await asyncio.wait({acquire}, timeout=settings.PDF_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.CancelledError:
+        if acquire.done():
+            workers.release()
+        else:
+            acquire.cancel()
+        raise
+    if acquire.done():
+        return True
+    acquire.cancel()
+    return False
+
+
+async def extract_text_from_pdf(file_content: Union[bytes, str]) -> str:
+    """
+    Extract text (from bytes or a spooled file path) in a bounded process pool so CPU-bound parsing never
+    blocks the event loop. Enforces per-document page, time and memory
+    limits and raises PdfExtractionBusy when the pool is saturated or a
+    queued document waits longer than PDF_QUEUE_TIMEOUT_SECONDS.
+    """
+    slots = _get_pdf_slots()
+    if slots.locked():
+        raise PdfExtractionBusy("PDF processing is at capacity, please retry shortly.")
+
+    async with slots:
+        workers = _get_pdf_workers()
+        if not await _acquire_pdf_worker(workers):
+            raise PdfExtractionBusy("PDF processing is at capacity, please retry shortly.")
+        try:
+            return await _run_pdf_job(file_content)
+        finally:
+            workers.release()
+
+
+async def _run_pdf_job(file_content: Union[bytes, str]) -> str:
+    """Parse on a pool process; the caller holds a worker, so the job starts at once."""
+    loop = asyncio.get_running_loop()
+    # One retry: a parse can fail only because another request's crashing
+    # document took the shared pool down with it
+    for attempt in range(2):
+        pool = _get_pdf_pool()
+        _pdf_pool_jobs[pool] = _pdf_pool_jobs.get(pool, 0) + 1
+        try:
+            future = loop.run_in_executor(
+                pool,
+                pdf_worker.extract_text,
+                file_content,
+                settings.PDF_MAX_PAGES,
+                settings.PDF_TIMEOUT_SECONDS
+            )
+            try:
+                # The worker enforces the timeout itself; this is the safety net
+                return await asyncio.wait_for(future, timeout=settings.PDF_TIMEOUT_SECONDS + 5)
+            except asyncio.TimeoutError:
+                logger.error("PDF worker overran its time limit, retiring pool")
+                _retire_pdf_pool(pool)
+                raise pdf_worker.PdfLimitExceeded("PDF parsing took too long")
+            except BrokenProcessPool:
+                if _pdf_pool is not pool and attempt == 0:
+                    logger.warning("PDF pool was recycled by another request, retrying")
+                    continue
+                logger.error("PDF worker crashed, recycling pool")
+                _reset_pdf_pool(pool)
+                raise pdf_worker.PdfLimitExceeded("PDF could not be processed")
+        finally:
+            _release_pdf_pool(pool)
+
+# ─── Content-hash caches ──────────────────────────────────
+# Bump when the analysis prompt changes so old results are not reused
+ANALYSIS_VERSION = "2"
+
+
+def hash_bytes(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def job_description_hash(job_description: str) -> str:
+    """Hash of the JD with case and whitespace normalized (plus prompt version)."""
+    normalized = " ".join((job_description or "").split()).casefold()
+    return hashlib.sha256(f"{ANALYSIS_VERSION}|{normalized}".encode("utf-8")).hexdigest()
+
+
+def _cache_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=settings.RESUME_CACHE_TTL_DAYS)
+
+
+def get_cached_text(file_hash: str, db: Session) -> Optional[str]:
+    row = db.query(ResumeTextCache).filter(
+        ResumeTextCache.file_hash == file_hash,
+        ResumeTextCache.created_at > _cache_cutoff()
+    ).first()
+    return row.text if row else None
+
+
+def store_text(file_hash: str, text: str, db: Session):
+    try:
+        stmt = pg_insert(ResumeTextCache).values(file_hash=file_hash, text=text)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ResumeTextCache.file_hash],
+            set_={"text": stmt.excluded.text, "created_at": func.now()}
+        )
+        db.execute(stmt)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failed to cache resume text: {e}")
+        db.rollback()
+
+
+def get_cached_analysis(file_hash: str, jd_hash: str, db: Session) -> Optional[dict]:
+    row = db.query(ResumeAnalysisCache).filter(
+        ResumeAnalysisCache.file_hash == file_hash,
+        ResumeAnalysisCache.jd_hash == jd_hash,
+        ResumeAnalysisCache.created_at > _cache_cutoff()
+    ).first()
+    return row.analysis if row else None
+
+
+def _is_cacheable(analysis) -> bool:
+    """
+    Never cache the error/mock payloads (ats_score 0 with a diagnostic
+    marker) or a local-only analysis that is missing its LLM feedback.
+    """
+    if not isinstance(analysis, dict) or analysis.get("feedback_available") is False:
+        return False
+    matched = (analysis.get("keyword_analysis") or {}).get("matched") or []
+    return not any(m in ("PARSING ERROR", "SYSTEM ERROR") for m in matched)
+
+
+def store_analysis(file_hash: str, jd_hash: str, analysis: dict, db: Session):
+    if not _is_cacheable(analysis):
+        return
+    try:
+        stmt = pg_insert(ResumeAnalysisCache).values(
+            file_hash=file_hash, jd_hash=jd_hash, analysis=analysis
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_resume_analysis_file_jd",
+            set_={"analysis": stmt.excluded.analysis, "created_at": func.now()}
+        )
+        db.execute(stmt)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failed to cache resume analysis: {e}")
+        db.rollback()
+
+
+def _parse_json_object(response: str) -> Optional[dict]:
+    """Extract the main JSON object from an LLM reply (markdown fences tolerated)."""
+    clean_response = (response or "").strip()
+    if "```json" in clean_response:
+        clean_response = clean_response.split("```json")[1].split("```")[0].strip()
+    elif "```" in clean_response:
+        clean_response = clean_response.split("```")[1].split("```")[0].strip()
+    try:
+        json_match = re.search(r'(\{.*\})', clean_response, re.DOTALL)
+        if json_match:
+            clean_response = json_match.group(1)
+        parsed = json.loads(clean_response)
+        return parsed if isinstance(parsed, dict) else None
+    except Exception as e:
+        logger.error(f"JSON Parsing failed: {str(e)}")
+        return None
+
+
+def _local_analysis(scored: dict, job_description: str) -> dict:
+    """Analysis payload built only from the local ATS engine (no LLM)."""
+    keyword_analysis = dict(scored["keyword_analysis"])
+    if not job_description:
+        keyword_analysis["missing"] = ["N/A - Provide a job description for gap analysis"]
+    return {
+        "ats_score": scored["ats_score"],
+        "keyword_analysis": keyword_analysis,
+        "industry_fit": {
+            "score": scored["ats_score"],
+            "verdict": "Scored locally on keywords, sections, bullet quality and formatting.",
+            "top_industries": []
+        },
+        "strengths": scored["strengths"],
+        "weaknesses": scored["improvements"],
+        "improvement_plan": scored["improvements"][:3],
+        "score_breakdown": scored["breakdown"],
+        "feedback_available": False,
+    }
+
+
+# ─── Section-aware chunking ───────────────────────────────
+# Long resumes are split at section headings and analyzed part by part
+# (concurrently) instead of being cut off at a fixed character count.
+_JD_CUE_RE = re.compile(r"require|must|should|experience|responsib|qualif|skill|knowledge|familiar|proficien|degree", re.IGNORECASE)
+
+
+def chunk_resume_text(resume_text: str, max_chars: int, max_chunks: Optional[int] = None) -> List[str]:
+    """
+    Pack whole sections into chunks of at most max_chars. A section that
+    is longer on its own is split on line boundaries, repeating its
+    heading so every chunk keeps its context. With max_chunks, the
+    smallest neighbouring chunks are then merged (growing past max_chars)
+    until no more than max_chunks remain.
+    """
+    pieces: List[str] = []
+    for name, body in ats_scoring_service.split_sections(resume_text):
+        if len(body) <= max_chars:
+            pieces.append(body)
+            continue
+        lines = body.splitlines()
+        heading = f"{lines[0]} (continued)" if name != "header" else ""
+        current = ""
+        for line in lines:
+            if current and len(current) + len(line) + 1 > max_chars:
+                pieces.append(current)
+                current = heading
+            # A single line longer than a chunk is hard-wrapped
+            while len(line) > max_chars:
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+            current = f"{current}\n{line}" if current else line
+        if current.strip():
+            pieces.append(current)
+
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + len(piece) + 2 <= max_chars:
+            chunks[-1] = f"{chunks[-1]}\n\n{piece}"
+        else:
+            chunks.append(piece)
+
+    while max_chunks and len(chunks) > max(max_chunks, 1):
+        i = min(range(len(chunks) - 1), key=lambda j: len(chunks[j]) + len(chunks[j + 1]))
+        chunks[i:i + 2] = [f"{chunks[i]}\n\n{chunks[i + 1]}"]
+    return chunks or [resume_text]
+
+
+def condense_job_description(job_description: str, max_chars: int) -> str:
+    """
+    Fit a long JD into max_chars by keeping the lines that carry
+    requirements (known skills or requirement cue words), in order,
+    headed by the full list of skills the JD names.
+    """
+    if len(job_description) <= max_chars:
+        return job_description
+    skills = ats_scoring_service.extract_skills(job_description)
+    condensed = f"Key skills: {', '.join(skills)}" if skills else ""
+    for line in job_description.splitlines():
+        line = line.strip()
+        if not line or not (_JD_CUE_RE.search(line) or ats_scoring_service.extract_skills(line)):
+            continue
+        if len(condensed) + len(line) + 1 > max_chars:
+            break
+        condensed = f"{condensed}\n{line}" if condensed else line
+    return condensed
+
+
+def _feedback_prompt(resume_part: str, job_description: str, local_summary: str, part_note: str) -> str:
     if job_description:
-        prompt = f"""
+        return f"""
         Analyze the following resume against the job description provided. 
-        Provide a highly detailed, professional analysis in JSON format.
+        The ATS score and keyword match are already computed; provide only narrative feedback in JSON format.
+        {part_note}
+        
+        {local_summary}
         
         Job Description:
-        {job_description[:2000]}
+        {job_description}
         
         Resume Text:
-        {resume_text[:3000]}
+        {resume_part}
         
         The JSON output must have exactly these keys:
-        1. "ats_score": Integer (0-100) based on compatibility.
-        2. "keyword_analysis": {{
-            "matched": [list of skills found in both],
-            "missing": [list of critical skills in JD but missing in resume],
-            "extra": [list of valuable skills in resume but not required by JD]
-        }}
-        3. "industry_fit": {{
+        1. "industry_fit": {{
             "score": Integer (0-100),
             "verdict": "A brief 2-sentence professional assessment of the alignment.",
             "top_industries": [list of 3 industries this profile aligns with]
         }}
-        4. "strengths": [list of 3-5 key professional strengths],
-        5. "weaknesses": [list of 3-5 areas for improvement],
-        6. "improvement_plan": [list of 3 actionable steps to improve the resume for this role]
+        2. "strengths": [list of 3-5 key professional strengths],
+        3. "weaknesses": [list of 3-5 areas for improvement],
+        4. "improvement_plan": [list of 3 actionable steps to improve the resume for this role]
         """
-    else:
-        prompt = f"""
-        Analyze the following resume text and provide a comprehensive professional assessment in JSON format.
+    return f"""
+        Analyze the following resume text and provide a professional assessment in JSON format.
+        The ATS score and detected skills are already computed; provide only narrative feedback.
         IMPORTANT: Return ONLY the valid JSON object. Do not use markdown keys or conversational text.
+        {part_note}
+        
+        {local_summary}
         
         Resume Text:
-        {resume_text[:3000]}
+        {resume_part}
         
         The JSON output must have exactly these keys:
-        1. "ats_score": Integer (0-100) based on formatting and content quality.
-        2. "keyword_analysis": {{
-            "matched": [list of detected technical and soft skills],
-            "missing": ["N/A - Provide a job description for gap analysis"],
-            "extra": []
-        }}
-        3. "industry_fit": {{
+        1. "industry_fit": {{
             "score": Integer (0-100),
             "verdict": "A brief professional summary of the user's career profile.",
             "top_industries": [list of 3 industries this profile aligns with]
         }}
-        4. "strengths": [list of 3-5 key professional strengths],
-        5. "weaknesses": [list of 3-5 areas for improvement],
-        6. "improvement_plan": [list of 3 actionable tips for general resume optimization]
+        2. "strengths": [list of 3-5 key professional strengths],
+        3. "weaknesses": [list of 3-5 areas for improvement],
+        4. "improvement_plan": [list of 3 actionable tips for general resume optimization]
         """
-    
-    import logging
-    logger = logging.getLogger(__name__)
-    
+
+
+async def _chunk_feedback(prompt: str) -> Optional[dict]:
+    system_prompt = "You are a world-class AI Career Consultant and Resume Strategist."
     response = await ai_hub.chat_completion([{"role": "user", "content": prompt}], system_prompt)
-    
     logger.info(f"Raw AI Response length: {len(response)}")
-    
-    # Try to extract JSON from the response
-    json_str = response
-    
-    import re
-    # Clean up response (Markdown stripping)
-    clean_response = response.strip()
-    if "```json" in clean_response:
-        clean_response = clean_response.split("```json")[1].split("```")[0].strip()
-    elif "```" in clean_response:
-        clean_response = clean_response.split("```")[1].split("```")[0].strip()
-    
-    # Robust Regex Extraction for main JSON object
-    try:
-        json_match = re.search(r'(\{.*\})', clean_response, re.DOTALL)
-        if json_match:
-            clean_response = json_match.group(1)
-        
-        return json.loads(clean_response)
-    except Exception as e:
-        logger.error(f"JSON Parsing failed: {str(e)}")
-        safe_snippet = str(clean_response)[:200].replace('"', "'").replace('\n', ' ')
-        
-        # Return a valid JSON structure with the ERROR details embedded
-        # This forces the frontend to display the error text instead of a generic "Good job" message
-        return {
-            "ats_score": 0,
-            "keyword_analysis": {
-                "matched": ["PARSING ERROR"],
-                "missing": [f"Error: {str(e)}"],
-                "extra": []
-            },
-            "industry_fit": {
-                "score": 0,
-                "verdict": f"RAW AI RESPONSE: {safe_snippet}...",
-                "top_industries": ["System Diagnosis"]
-            },
-            "strengths": ["System is online", "Error captured"],
-            "weaknesses": ["Response was not valid JSON", "See verdict for details"],
-            "improvement_plan": ["Report this error", "Retry analysis"]
-        }
+    feedback = _parse_json_object(response)
+    # Parse failure or the AI-unavailable mock payload
+    if not feedback or not _is_cacheable(feedback):
+        return None
+    return feedback
+
+
+def _interleave_unique(lists: List[list], limit: int) -> list:
+    """Round-robin merge so every chunk is represented, de-duplicated case-insensitively."""
+    merged, seen = [], set()
+    for i in range(max((len(l) for l in lists), default=0)):
+        for items in lists:
+            if i < len(items) and isinstance(items[i], str):
+                key = items[i].strip().casefold()
+                if key and key not in seen:
+                    seen.add(key)
+                    merged.append(items[i])
+    return merged[:limit]
+
+
+def _merge_feedback(results: List[Tuple[dict, int]]) -> dict:
+    """Merge per-chunk feedback; industry scores are weighted by chunk length."""
+    fits = [(r.get("industry_fit") or {}, size) for r, size in results]
+    scored = [(f["score"], size) for f, size in fits if isinstance(f.get("score"), (int, float))]
+    industries = Counter(
+        ind for f, _ in fits for ind in (f.get("top_industries") or []) if isinstance(ind, str)
+    )
+    verdict = next((f.get("verdict") for f, _ in fits if f.get("verdict")), "")
+    return {
+        "industry_fit": {
+            "score": round(sum(s * n for s, n in scored) / sum(n for _, n in scored)) if scored else 0,
+            "verdict": verdict,
+            "top_industries": [ind for ind, _ in industries.most_common(3)],
+        },
+        "strengths": _interleave_unique([r.get("strengths") or [] for r, _ in results], 6),
+        "weaknesses": _interleave_unique([r.get("weaknesses") or [] for r, _ in results], 6),
+        "improvement_plan": _interleave_unique([r.get("improvement_plan") or [] for r, _ in results], 5),
+    }
+
+
+async def analyze_resume_with_ai(
+    resume_text: str, job_description: str = "", with_feedback: Optional[bool] = None,
+    on_llm_calls: Optional[Callable[[int], None]] = None,
+):
+    """
+    Score the resume with the local ATS engine, then (optionally) ask the
+    LLM for narrative feedback. The score and keyword analysis always come
+    from the local engine; if the LLM is disabled or fails, the heuristic
+    narrative is returned with feedback_available=False.
+
+    Long resumes are split into section-aligned chunks that are analyzed
+    concurrently and merged, so nothing past a fixed length is dropped.
+    `on_llm_calls(n)` is told how many LLM calls are about to be made (and may raise to refuse them).
+    """
+    if with_feedback is None:
+        with_feedback = settings.ATS_LLM_FEEDBACK
+
+    scored = ats_scoring_service.score_resume(resume_text, job_description=job_description)
+    analysis = _local_analysis(scored, job_description)
+    if not with_feedback:
+        return analysis
+
+    local_summary = (
+        f"ATS score (computed): {scored['ats_score']}/100\n"
+        f"Matched keywords: {', '.join(scored['keyword_analysis']['matched']) or 'none'}\n"
+        f"Missing keywords: {', '.join(scored['keyword_analysis']['missing']) or 'none'}\n"
+        f"Missing sections: {', '.join(scored['sections']['missing']) or 'none'}"
+    )
+    jd_text = condense_job_description(job_description, settings.RESUME_JD_PROMPT_CHARS) if job_description else ""
+
+    # Chunks grow rather than fan out past RESUME_MAX_CHUNKS calls
+    chunks = chunk_resume_text(resume_text, settings.RESUME_CHUNK_CHARS, settings.RESUME_MAX_CHUNKS)
+    prompts = []
+    for i, chunk in enumerate(chunks, start=1):
+        part_note = "" if len(chunks) == 1 else (
+            f"This is part {i} of {len(chunks)} of the resume; comment only on what this part shows."
+        )
+        prompts.append(_feedback_prompt(chunk, jd_text, local_summary, part_note))
+
+    if on_llm_calls:
+        on_llm_calls(len(prompts))
+
+    results = await asyncio.gather(*(_chunk_feedback(p) for p in prompts), return_exceptions=True)
+    usable = []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, Exception):
+            logger.error(f"Resume chunk analysis failed: {result}")
+        elif result:
+            usable.append((result, len(chunk)))
+    if not usable:
+        return analysis
+
+    feedback = usable[0][0] if len(chunks) == 1 else _merge_feedback(usable)
+    for key in ("industry_fit", "strengths", "weaknesses", "improvement_plan"):
+        if feedback.get(key):
+            analysis[key] = feedback[key]
+    # A partially failed chunked analysis is returned but not cached
+    analysis["feedback_available"] = len(usable) == len(chunks)
+    return analysis
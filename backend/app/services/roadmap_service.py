@@ -8,6 +8,7 @@ import logging
 from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.services.ai_service import ai_hub
+from app.services import learning_content_service
 from app.models.career import Roadmap
 
 logger = logging.getLogger(__name__)
@@ -132,6 +133,12 @@ async def generate_roadmap(
         db.commit()
         db.refresh(roadmap)
 
+        # Warm the learning cache for the first LEARNING_PREFETCH_LEVELS levels
+        try:
+            learning_content_service.schedule_roadmap_prefetch(roadmap_data)
+        except Exception as e:
+            logger.error(f"Failed to schedule learning prefetch: {e}")
+
         return {
             "id": str(roadmap.id),
             "target_role": target_role,
@@ -0,0 +1,145 @@
+"""
+Skill Registry — canonical skill names shared by caches and indexes.
+
+"React", "React.js", "ReactJS" and "react " all resolve to the same
+canonical name ("React") and stable id ("react"). Applied at write time
+to LearningCache.skill_name, QuizAttempt.skill_name, Opportunity.skill_tags
+and Profile.skills so every cache and index sees one key per skill.
+
+Unknown skills are kept (never dropped) with whitespace cleaned up, and
+their id is derived from the same normalized key.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List
+
+# ─── Canonical skills and their aliases ───────────────────
+# canonical display name -> aliases (any spelling, case and punctuation
+# variants are folded by _normalize_key, so only true synonyms go here)
+SKILL_ALIASES = {
+    "JavaScript": ["js", "ecmascript", "es6"],
+    "TypeScript": ["ts"],
+    "Python": ["py", "python3"],
+    "Java": [],
+    "C++": ["cpp"],
+    "C#": ["csharp", "c sharp"],
+    "Go": ["golang"],
+    "React": ["reactjs", "react js"],
+    "React Native": ["reactnative"],
+    "Node.js": ["node", "nodejs"],
+    "Next.js": ["nextjs"],
+    "Vue": ["vuejs", "vue js"],
+    "Angular": ["angularjs"],
+    "Express": ["expressjs"],
+    "Django": [],
+    "FastAPI": [],
+    "Flask": [],
+    "HTML & CSS": ["html css", "html and css", "html/css"],
+    "SQL": [],
+    "PostgreSQL": ["postgres", "psql"],
+    "MySQL": [],
+    "MongoDB": ["mongo"],
+    "Microsoft SQL Server": ["mssql", "sql server"],
+    "Machine Learning": ["ml"],
+    "Deep Learning": ["dl"],
+    "Artificial Intelligence": ["ai"],
+    "Natural Language Processing": ["nlp"],
+    "Computer Vision": ["cv"],
+    "Data Structures and Algorithms": ["dsa", "data structures & algorithms"],
+    "Object Oriented Programming": ["oop", "oops", "object-oriented programming"],
+    "Kubernetes": ["k8s"],
+    "Docker": [],
+    "Amazon Web Services": ["aws"],
+    "Google Cloud Platform": ["gcp", "google cloud"],
+    "Microsoft Azure": ["azure"],
+    "CI/CD": ["cicd", "continuous integration", "continuous delivery"],
+    "Git": [],
+    "Linux": [],
+    "REST APIs": ["rest", "rest api", "restful api", "restful apis"],
+    "GraphQL": [],
+    "User Experience": ["ux", "ux design"],
+    "User Interface": ["ui", "ui design"],
+    "TensorFlow": [],
+    "PyTorch": ["torch"],
+    "Pandas": [],
+    "NumPy": [],
+    "Scikit-learn": ["sklearn", "scikit learn"],
+    "Tailwind CSS": ["tailwind", "tailwindcss"],
+}
+
+# Characters folded away when building a lookup key.
+# '+' and '#' are kept so C, C++ and C# stay distinct.
+_PUNCT_RE = re.compile(r"[\s.\-_/\\,;:'\"`()\[\]{}!?&]+")
+_SLUG_RE = re.compile(r"[^a-z0-9+#]+")
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(
+        ch for ch in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(ch)
+    )
+
+
+@lru_cache(maxsize=4096)
+def _normalize_key(name: str) -> str:
+    """Unicode-, case- and punctuation-insensitive lookup key."""
+    text = _strip_accents(unicodedata.normalize("NFKC", name or "")).casefold()
+    text = text.replace("&", " and ")
+    return _PUNCT_RE.sub("", text)
+
+
+def _build_lookup() -> dict:
+    lookup = {}
+    for canonical, aliases in SKILL_ALIASES.items():
+        for variant in [canonical, *aliases]:
+            lookup[_normalize_key(variant)] = canonical
+    return lookup
+
+
+_LOOKUP = _build_lookup()
+
+
+@lru_cache(maxsize=4096)
+def canonicalize(name: str) -> str:
+    """
+    Canonical display name for a skill. Unknown skills are returned with
+    surrounding/inner whitespace collapsed and otherwise unchanged.
+    """
+    if not name:
+        return ""
+    cleaned = " ".join(unicodedata.normalize("NFKC", str(name)).split())
+    return _LOOKUP.get(_normalize_key(cleaned), cleaned)
+
+
+@lru_cache(maxsize=4096)
+def skill_id(name: str) -> str:
+    """Stable id for a skill, e.g. "React.js" -> "react", "C#" -> "c#"."""
+    canonical = canonicalize(name)
+    text = _strip_accents(canonical).casefold().replace("&", " and ")
+    return _SLUG_RE.sub("-", text).strip("-")
+
+
+def is_known(name: str) -> bool:
+    return _normalize_key(name or "") in _LOOKUP
+
+
+def canonicalize_list(names: Iterable) -> List[str]:
+    """Canonicalize and de-duplicate (by skill id), preserving order."""
+    seen = set()
+    result = []
+    for name in names or []:
+        canonical = canonicalize(str(name)) if name is not None else ""
+        if not canonical:
+            continue
+        sid = skill_id(canonical)
+        if sid in seen:
+            continue
+        seen.add(sid)
+        result.append(canonical)
+    return result
+
+
+def merge_skill_lists(existing: Iterable, new: Iterable) -> List[str]:
+    """Union of two skill lists in canonical form (existing order first)."""
+    return canonicalize_list([*(existing or []), *(new or [])])
@@ -0,0 +1,26 @@
+-- ============================================================
+-- Opportunity Deduplication Key
+-- Adds a normalized (title, source) key with a UNIQUE constraint so
+-- discovery batches can be persisted with INSERT ... ON CONFLICT.
+-- ============================================================
+
+-- 1. Add the key column
+ALTER TABLE public.opportunities ADD COLUMN IF NOT EXISTS dedupe_key TEXT;
+
+-- 2. Backfill: lowercase + collapse whitespace (matches make_dedupe_key)
+UPDATE public.opportunities
+SET dedupe_key =
+    lower(regexp_replace(btrim(title), '\s+', ' ', 'g'))
+    || '|' ||
+    lower(regexp_replace(btrim(coalesce(source, '')), '\s+', ' ', 'g'))
+WHERE dedupe_key IS NULL;
+
+-- 3. Remove existing duplicates, keeping the oldest row per key
+DELETE FROM public.opportunities o
+USING public.opportunities d
+WHERE o.dedupe_key = d.dedupe_key
+  AND (o.created_at, o.id) > (d.created_at, d.id);
+
+-- 4. Enforce uniqueness
+CREATE UNIQUE INDEX IF NOT EXISTS uq_opportunities_dedupe_key
+    ON public.opportunities(dedupe_key);
@@ -0,0 +1,21 @@
+-- ============================================================
+-- Opportunity Live Indexes
+-- Partial indexes covering only live (is_expired = false) rows.
+-- Deadline expiry is evaluated at read time; the daily job only
+-- flips is_expired in small batches using the deadline index.
+-- ============================================================
+
+-- 1. Filtered listing: type + level, newest first
+CREATE INDEX IF NOT EXISTS idx_opportunities_live_type_level_created
+    ON public.opportunities(opportunity_type, level, created_at DESC)
+    WHERE is_expired = false;
+
+-- 2. Unfiltered listing / index warm-up, newest first
+CREATE INDEX IF NOT EXISTS idx_opportunities_live_created
+    ON public.opportunities(created_at DESC)
+    WHERE is_expired = false;
+
+-- 3. Incremental expiry: live rows that have a deadline
+CREATE INDEX IF NOT EXISTS idx_opportunities_live_deadline
+    ON public.opportunities(deadline)
+    WHERE is_expired = false AND deadline IS NOT NULL;
@@ -0,0 +1,12 @@
+-- ============================================================
+-- Learning Cache TTL
+-- Per-entry expiry for cached learning resources. Expired rows are
+-- still served (stale-while-revalidate) until a refresh replaces them.
+-- ============================================================
+
+ALTER TABLE public.learning_cache ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ;
+
+-- Existing rows age from their creation time (7 day default TTL)
+UPDATE public.learning_cache
+SET expires_at = created_at + INTERVAL '7 days'
+WHERE expires_at IS NULL;
@@ -0,0 +1,27 @@
+-- ============================================================
+-- Resume Analysis Cache
+-- Extracted PDF text keyed by SHA-256 of the file bytes, and AI
+-- analyses keyed by (file hash, normalized job description hash).
+-- Server-side only: no RLS policies, the backend reads/writes these.
+-- ============================================================
+
+-- 1. Extracted text per file
+CREATE TABLE IF NOT EXISTS public.resume_text_cache (
+    file_hash VARCHAR(64) PRIMARY KEY,
+    text TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- 2. Analysis per (file, job description)
+CREATE TABLE IF NOT EXISTS public.resume_analysis_cache (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    file_hash VARCHAR(64) NOT NULL,
+    jd_hash VARCHAR(64) NOT NULL,
+    analysis JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT uq_resume_analysis_file_jd UNIQUE (file_hash, jd_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_resume_analysis_cache_file ON public.resume_analysis_cache(file_hash);
+
+ALTER TABLE public.resume_text_cache ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.resume_analysis_cache ENABLE ROW LEVEL SECURITY;
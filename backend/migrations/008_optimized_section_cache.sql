@@ -0,0 +1,24 @@
+-- ============================================================
+-- Incremental Resume Optimization
+-- Per-section content hashes on saved resumes, and optimized
+-- entries keyed by (content hash, normalized target role,
+-- template style) so only changed entries are re-optimized.
+-- Server-side only: no RLS policies, the backend reads/writes the cache.
+-- ============================================================
+
+-- 1. Section hashes of resume_data
+ALTER TABLE public.saved_resumes
+    ADD COLUMN IF NOT EXISTS section_hashes JSONB;
+
+-- 2. Optimized entries
+CREATE TABLE IF NOT EXISTS public.optimized_section_cache (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    section_hash VARCHAR(64) NOT NULL,
+    target_role TEXT NOT NULL DEFAULT '',
+    template_style TEXT NOT NULL,
+    optimized JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT uq_optimized_section_key UNIQUE (section_hash, target_role, template_style)
+);
+
+ALTER TABLE public.optimized_section_cache ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,13 @@
+-- ============================================================
+-- OTP Lifecycle
+-- Composite index for "latest OTP for this email" lookups and the
+-- conditional verification UPDATE. Expired and used rows are
+-- purged by a background job (see background_jobs.purge_otps_job).
+-- ============================================================
+
+-- 1. Latest OTP per email
+CREATE INDEX IF NOT EXISTS idx_otps_email_created
+    ON public.otps(email, created_at DESC);
+
+-- 2. The single-column email index is covered by the composite one
+DROP INDEX IF EXISTS public.ix_otps_email;
@@ -0,0 +1,18 @@
+-- ============================================================
+-- Admin Page Indexes
+-- Support the set-based admin user / progress pages: newest
+-- users first, and per-user "latest" lookups (DISTINCT ON).
+-- ============================================================
+
+-- 1. User listing, newest first
+CREATE INDEX IF NOT EXISTS idx_users_created
+    ON public.users(created_at DESC);
+
+-- 2. Latest progress snapshot per user
+CREATE INDEX IF NOT EXISTS idx_progress_user_date
+    ON public.progress_snapshots(user_id, snapshot_date DESC);
+
+-- 3. Newest active roadmap per user
+CREATE INDEX IF NOT EXISTS idx_roadmaps_user_active_created
+    ON public.roadmaps(user_id, created_at DESC)
+    WHERE is_active = true;
@@ -0,0 +1,16 @@
+-- ============================================================
+-- Admin User Search
+-- Trigram indexes so the admin search (ILIKE '%term%' on email
+-- or full name) uses an index instead of scanning users.
+-- ============================================================
+
+-- 1. Trigram operator classes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 2. Email substring search
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm
+    ON public.users USING gin (email gin_trgm_ops);
+
+-- 3. Full name substring search
+CREATE INDEX IF NOT EXISTS idx_profiles_full_name_trgm
+    ON public.profiles USING gin (full_name gin_trgm_ops);
@@ -0,0 +1,24 @@
+-- ============================================================
+-- Learning Cache Level
+-- NULL levels never conflict with UNIQUE(skill_name, level), so
+-- upserts for level-less skills piled up duplicate rows. Store ""
+-- instead and keep only the newest row per skill.
+-- ============================================================
+
+-- 1. Drop NULL-level rows superseded by a newer NULL-level row
+DELETE FROM public.learning_cache a
+USING public.learning_cache b
+WHERE a.level IS NULL AND b.level IS NULL
+  AND a.skill_name = b.skill_name
+  AND (a.created_at, a.id) < (b.created_at, b.id);
+
+-- 2. Drop NULL-level rows that already have an '' row
+DELETE FROM public.learning_cache a
+USING public.learning_cache b
+WHERE a.level IS NULL AND b.level = ''
+  AND a.skill_name = b.skill_name;
+
+-- 3. Make level non-null
+UPDATE public.learning_cache SET level = '' WHERE level IS NULL;
+ALTER TABLE public.learning_cache ALTER COLUMN level SET DEFAULT '';
+ALTER TABLE public.learning_cache ALTER COLUMN level SET NOT NULL;
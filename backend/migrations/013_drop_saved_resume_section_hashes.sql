@@ -0,0 +1,8 @@
+-- ============================================================
+-- Drop saved_resumes.section_hashes
+-- Added in 008 but never read, and never refreshed after the first
+-- save. The optimizer keys its cache by content hashes computed on
+-- each request, so the stored copy is not needed.
+-- ============================================================
+
+ALTER TABLE public.saved_resumes DROP COLUMN IF EXISTS section_hashes;
@@ -0,0 +1,16 @@
+-- ============================================================
+-- Opportunity updated_at Index
+-- Each worker's in-process search index pulls rows changed since
+-- its last sync (updated_at >= watermark) every
+-- OPPORTUNITY_INDEX_REFRESH_SECONDS; without an index that is a
+-- full scan of opportunities per worker per interval.
+-- ============================================================
+
+-- 1. Rows from before updated_at had a default
+UPDATE public.opportunities
+SET updated_at = COALESCE(created_at, NOW())
+WHERE updated_at IS NULL;
+
+-- 2. Delta refresh
+CREATE INDEX IF NOT EXISTS idx_opportunities_updated_at
+    ON public.opportunities(updated_at);
@@ -0,0 +1,11 @@
+-- ============================================================
+-- Drop Unused Opportunity Listing Indexes
+-- Added in 005 for SQL listing queries. Filtering and ranking now
+-- happen in the in-process search index (the DB is only asked for
+-- ids), so no query uses them, while every upsert maintains them.
+-- idx_opportunities_live_deadline (expiry job) and
+-- idx_opportunities_updated_at (index refresh) stay.
+-- ============================================================
+
+DROP INDEX IF EXISTS public.idx_opportunities_live_type_level_created;
+DROP INDEX IF EXISTS public.idx_opportunities_live_created;
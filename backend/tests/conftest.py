@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Settings are read at import time: keep tests off the configured database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
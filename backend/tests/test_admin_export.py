@@ -0,0 +1,41 @@
+import csv
+import io
+
+import pytest
+
+from app.services.admin_service import EXPORT_COLUMNS, _csv_safe
+
+
+@pytest.mark.parametrize("value", [
+    "=HYPERLINK(\"http://evil\",\"x\")",
+    "+1+1",
+    "-2+3",
+    "@SUM(A1)",
+    "\tcmd",
+    "\rcmd",
+])
+def test_formula_cells_are_quoted(value):
+    assert _csv_safe({"full_name": value}) == {"full_name": f"'{value}"}
+
+
+def test_plain_and_non_string_values_are_unchanged():
+    record = {
+        "email": "jane@example.com",
+        "full_name": "Jane - Doe",
+        "career_score": -1.5,
+        "is_active": True,
+        "snapshot_date": None,
+    }
+    assert _csv_safe(record) == record
+
+
+def test_quoted_cells_survive_a_csv_round_trip():
+    record = {column: None for column in EXPORT_COLUMNS}
+    record.update(email="=cmd|' /C calc'!A0@x.com", full_name="@evil")
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    writer.writerow(_csv_safe(record))
+    row = next(csv.DictReader(io.StringIO(buffer.getvalue())))
+    assert row["email"] == "'=cmd|' /C calc'!A0@x.com"
+    assert row["full_name"] == "'@evil"
@@ -0,0 +1,61 @@
+import pytest
+
+from app.core.config import settings
+from app.services import admin_service
+
+
+class FakeStats:
+    """Stands in for compute_user_stats; `during` runs mid-computation."""
+
+    def __init__(self):
+        self.calls = 0
+        self.during = None
+
+    def __call__(self, db):
+        self.calls += 1
+        if self.during:
+            during, self.during = self.during, None
+            during()
+        return {"total_users": self.calls}
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    fake = FakeStats()
+    monkeypatch.setattr(admin_service, "compute_user_stats", fake)
+    monkeypatch.setattr(settings, "ADMIN_STATS_MAX_AGE_SECONDS", 300)
+    return fake
+
+
+def test_get_caches_until_invalidated(stats):
+    cache = admin_service.AdminStatsCache()
+    assert cache.get(db=None)["total_users"] == 1
+    assert cache.get(db=None)["total_users"] == 1
+    cache.invalidate()
+    assert cache.get(db=None)["total_users"] == 2
+
+
+def test_refresh_replaces_the_cached_counts(stats):
+    cache = admin_service.AdminStatsCache()
+    cache.get(db=None)
+    cache.refresh(db=object())
+    assert cache.get(db=None)["total_users"] == 2
+    assert stats.calls == 2
+
+
+def test_refresh_racing_an_invalidation_is_discarded(stats):
+    cache = admin_service.AdminStatsCache()
+    # An admin change lands while the background refresh is counting
+    stats.during = cache.invalidate
+    cache.refresh(db=object())
+    # The pre-change counts were not stored: the next read recomputes
+    assert cache.get(db=None)["total_users"] == 2
+    assert stats.calls == 2
+
+
+def test_stale_counts_are_recomputed(stats, monkeypatch):
+    cache = admin_service.AdminStatsCache()
+    cache.get(db=None)
+    monkeypatch.setattr(settings, "ADMIN_STATS_MAX_AGE_SECONDS", 0)
+    assert cache.get(db=None)["total_users"] == 2
+    assert "stats_as_of" in cache.get(db=None)
@@ -0,0 +1,67 @@
+from app.services import ats_scoring_service
+
+STRONG_RESUME = """Jane Doe
+jane@example.com | +1 555 123 4567
+Summary
+Backend engineer building Python services.
+Experience
+- Developed REST APIs in Python and PostgreSQL serving 50k users
+- Led migration to Docker and Kubernetes, cutting deploy time by 40%
+- Optimized SQL queries reducing latency by 30%
+- Built Redis caching layer for 10 microservices
+- Designed CI/CD pipelines with Git
+- Mentored 3 engineers
+Education
+B.Sc. Computer Science, 2018
+Skills
+Python, SQL, PostgreSQL, Docker, Git, Redis, REST APIs, Microservices
+Projects
+- Implemented a Node.js gateway handling 1000 requests per second
+"""
+
+WEAK_RESUME = "I like computers and want a job."
+
+
+def test_score_is_deterministic_and_bounded():
+    first = ats_scoring_service.score_resume(STRONG_RESUME, target_role="Backend Engineer")
+    second = ats_scoring_service.score_resume(STRONG_RESUME, target_role="Backend Engineer")
+    assert first == second
+    assert 0 <= first["ats_score"] <= 100
+
+
+def test_score_is_the_sum_of_the_breakdown():
+    result = ats_scoring_service.score_resume(STRONG_RESUME, target_role="Backend Engineer")
+    assert result["ats_score"] == int(round(sum(result["breakdown"].values())))
+    for part, weight in ats_scoring_service.WEIGHTS.items():
+        assert 0 <= result["breakdown"][part] <= weight
+
+
+def test_complete_resume_outscores_a_weak_one():
+    strong = ats_scoring_service.score_resume(STRONG_RESUME, target_role="Backend Engineer")
+    weak = ats_scoring_service.score_resume(WEAK_RESUME, target_role="Backend Engineer")
+    assert strong["ats_score"] >= 80
+    assert weak["ats_score"] <= 20
+    assert strong["sections"]["missing"] == []
+    assert set(weak["sections"]["missing"]) == {"experience", "education", "skills", "summary", "projects"}
+
+
+def test_job_description_keywords_are_matched_and_missing():
+    jd = "We need Python, Kubernetes and Go experience with AWS."
+    result = ats_scoring_service.score_resume(STRONG_RESUME, job_description=jd)
+    assert {"Python", "Kubernetes"} <= set(result["keyword_analysis"]["matched"])
+    assert "Go" in result["keyword_analysis"]["missing"]
+    assert "Python" not in result["keyword_analysis"]["missing"]
+
+
+def test_bullet_checks():
+    result = ats_scoring_service.score_resume(STRONG_RESUME)
+    checks = result["checks"]
+    assert checks["bullet_count"] == 7
+    assert checks["action_verb_ratio"] >= 0.8
+    assert checks["quantified_ratio"] >= 0.5
+    assert checks["has_email"] and checks["has_phone"]
+
+
+def test_split_sections_keeps_document_order():
+    names = [name for name, _ in ats_scoring_service.split_sections(STRONG_RESUME)]
+    assert names == ["header", "summary", "experience", "education", "skills", "projects"]
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import crud_otp
+from app.models.otp import OTP
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+EMAIL = "user@example.com"
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    OTP.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _create(db, code="123456", expires_in=timedelta(minutes=10), user_data=None):
+    return crud_otp.create_otp(db, EMAIL, code, datetime.now(timezone.utc) + expires_in, user_data)
+
+
+def _consume(db, code):
+    outcome = crud_otp.consume_otp(db, EMAIL, code)
+    db.commit()
+    return outcome
+
+
+def test_valid_code_can_only_be_used_once(db):
+    _create(db, user_data={"full_name": "Jane"})
+    assert _consume(db, "123456") == (crud_otp.OTP_VALID, {"full_name": "Jane"})
+    assert _consume(db, "123456") == (crud_otp.OTP_USED, None)
+
+
+def test_wrong_code_counts_an_attempt(db):
+    otp = _create(db)
+    assert _consume(db, "000000") == (crud_otp.OTP_INVALID, None)
+    db.refresh(otp)
+    assert otp.attempts == 1 and not otp.is_used
+    assert _consume(db, "123456")[0] == crud_otp.OTP_VALID
+
+
+def test_too_many_attempts_locks_the_code(db):
+    _create(db)
+    for _ in range(crud_otp.MAX_OTP_ATTEMPTS):
+        assert _consume(db, "000000")[0] == crud_otp.OTP_INVALID
+    assert _consume(db, "123456") == (crud_otp.OTP_TOO_MANY_ATTEMPTS, None)
+
+
+def test_expired_code_is_rejected(db):
+    _create(db, expires_in=timedelta(minutes=-1))
+    assert _consume(db, "123456") == (crud_otp.OTP_EXPIRED, None)
+
+
+def test_only_the_latest_code_counts(db):
+    older = _create(db, code="111111")
+    older.created_at = datetime.now(timezone.utc) - timedelta(minutes=1)
+    db.commit()
+    _create(db, code="222222")
+    assert _consume(db, "111111")[0] == crud_otp.OTP_INVALID
+    assert _consume(db, "222222")[0] == crud_otp.OTP_VALID
+
+
+def test_unknown_email(db):
+    assert _consume(db, "123456") == (crud_otp.OTP_NOT_FOUND, None)
@@ -0,0 +1,67 @@
+import pytest
+
+from app.core.config import settings
+from app.core.rate_limit import MemoryBackend, RateLimiter, RateLimitExceeded
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_REDIS_URL", "")
+    monkeypatch.setattr(settings, "RATE_LIMIT_LLM_PER_MINUTE", 100)
+    monkeypatch.setattr(settings, "RATE_LIMIT_GUEST_LLM_PER_MINUTE", 100)
+    monkeypatch.setattr(settings, "LLM_DAILY_BUDGET", 5)
+    monkeypatch.setattr(settings, "LLM_GUEST_DAILY_BUDGET", 2)
+    return RateLimiter()
+
+
+def test_daily_budget_is_enforced(limiter):
+    for _ in range(5):
+        limiter.check("llm", "user:1", is_guest=False)
+    with pytest.raises(RateLimitExceeded) as exc:
+        limiter.check("llm", "user:1", is_guest=False)
+    assert "Daily" in exc.value.detail
+    assert exc.value.retry_after >= 1
+
+
+def test_daily_budget_counts_call_cost(limiter):
+    limiter.check("llm", "user:1", is_guest=False, cost=4)
+    with pytest.raises(RateLimitExceeded):
+        limiter.check("llm", "user:1", is_guest=False, cost=2)
+
+
+def test_guests_get_the_guest_budget(limiter):
+    limiter.check("llm", "ip:10.0.0.1", is_guest=True, cost=2)
+    with pytest.raises(RateLimitExceeded):
+        limiter.check("llm", "ip:10.0.0.1", is_guest=True)
+    # Budgets are per identity
+    limiter.check("llm", "ip:10.0.0.2", is_guest=True)
+
+
+def test_budget_only_applies_to_llm(limiter, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_AUTH_PER_MINUTE", 100)
+    for _ in range(10):
+        limiter.check("auth", "ip:10.0.0.1", is_guest=True)
+
+
+def test_zero_cost_and_disabled_are_free(limiter, monkeypatch):
+    limiter.check("llm", "user:1", is_guest=False, cost=0)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    for _ in range(10):
+        limiter.check("llm", "user:1", is_guest=False)
+
+
+def test_sliding_window_charges_cost_and_reports_retry_after():
+    backend = MemoryBackend()
+    assert backend.hit("k", limit=3, window=60, now=100.0, cost=2) == (True, 0.0)
+    allowed, retry_after = backend.hit("k", limit=3, window=60, now=110.0, cost=2)
+    assert not allowed
+    assert retry_after == pytest.approx(50.0)
+    # Old entries leave the window
+    assert backend.hit("k", limit=3, window=60, now=161.0, cost=3)[0]
+
+
+def test_cost_over_the_limit_is_refused_on_an_empty_window():
+    allowed, retry_after = MemoryBackend().hit("k", limit=3, window=60, now=100.0, cost=4)
+    assert not allowed
+    assert retry_after == 60
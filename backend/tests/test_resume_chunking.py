@@ -0,0 +1,48 @@
+from app.services.resume_service import chunk_resume_text
+
+HEADINGS = ["Experience", "Education", "Projects", "Skills", "Certifications", "Summary", "Awards", "Publications"]
+
+
+def _resume(section_chars: int) -> str:
+    line = "word " * 99
+    lines_per_section = max(1, section_chars // len(line))
+    return "\n".join(f"{h}\n" + "\n".join([line] * lines_per_section) for h in HEADINGS)
+
+
+def test_sections_are_packed_up_to_max_chars():
+    text = _resume(1000)
+    chunks = chunk_resume_text(text, 3000)
+    assert 1 < len(chunks) < len(HEADINGS)
+    assert all(len(c) <= 3000 for c in chunks)
+
+
+def test_max_chunks_is_enforced():
+    # Eight ~2.5k sections pack into more chunks than the cap at 3000 chars
+    text = _resume(2500)
+    assert len(chunk_resume_text(text, 3000)) > 4
+    chunks = chunk_resume_text(text, 3000, max_chunks=4)
+    assert len(chunks) == 4
+
+
+def test_merged_chunks_keep_all_sections_in_order():
+    text = _resume(2500)
+    joined = "\n\n".join(chunk_resume_text(text, 3000, max_chunks=3))
+    positions = [joined.index(h) for h in HEADINGS]
+    assert positions == sorted(positions)
+
+
+def test_long_section_is_split_with_its_heading_repeated():
+    text = "Experience\n" + "\n".join(["- built things " * 20] * 30)
+    chunks = chunk_resume_text(text, 1000)
+    assert len(chunks) > 1
+    assert all(c.startswith("Experience") for c in chunks)
+    assert all(len(c) <= 1000 for c in chunks)
+
+
+def test_short_resume_is_one_chunk():
+    chunks = chunk_resume_text("Jane Doe\nSkills\nPython", 3000, max_chunks=4)
+    assert chunks == ["Jane Doe\n\nSkills\nPython"]
+
+
+def test_max_chunks_of_one_merges_everything():
+    assert len(chunk_resume_text(_resume(2500), 3000, max_chunks=1)) == 1